@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Groups.io Archive Backfill
+
+Walks the full topic history of every subscribed group (following
+next_page_token) and downloads each topic's first message, writing
+everything into the local topic store and search index that
+fastapi_rss_server.py reads.
+
+Progress is checkpointed after every page, so an interrupted run picks up
+where it stopped. Requests run on a small thread pool under a global rate
+limit, and progress lines report throughput and an ETA.
+
+Usage:
+    python3 backfill_archive.py [--groups 8395,8396] [--concurrency 4] [--rate 5]
+
+Options:
+    --groups        Comma-separated group ids (default: all with archive access)
+    --concurrency   Parallel topic downloads (default: 4)
+    --rate          Max API requests per second (default: 5)
+    --page-size     Topics per gettopics page (default: 100)
+    --checkpoint    Checkpoint file (default: backfill_checkpoint.json)
+    --restart       Ignore the checkpoint and start from the newest topics
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+from media_cache import message_attachments
+from search_index import SearchIndex
+from topic_store import TopicStore
+
+load_dotenv()
+
+API_KEY = os.getenv("GROUPS_IO_API_KEY")
+BASE_URL = os.getenv("GROUPS_IO_BASE_URL", "https://groups.io/api/v1")
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.db")
+TOPIC_STORE_PATH = os.getenv("TOPIC_STORE_PATH", "topics")
+MAX_RETRIES = 5
+
+
+class RateLimiter:
+    """Spaces out requests from all threads to at most `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Backfill:
+    """One backfill run: API access, checkpointing and progress reporting"""
+
+    def __init__(self, args):
+        self.args = args
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {API_KEY}"
+        self.limiter = RateLimiter(args.rate)
+        self.index = SearchIndex(SEARCH_INDEX_PATH)
+        self.store = TopicStore(TOPIC_STORE_PATH, writable=True)
+        self.stats_lock = threading.Lock()
+        self.bytes = 0
+        self.topics = 0
+        self.started = time.time()
+        self.checkpoint = {"groups": {}}
+        if not args.restart:
+            self.checkpoint = load_checkpoint(args.checkpoint)
+
+    def api_get(self, endpoint, params):
+        """Rate-limited GET with retries on throttling and server errors"""
+        for attempt in range(MAX_RETRIES):
+            self.limiter.wait()
+            try:
+                response = self.session.get(f"{BASE_URL}/{endpoint}", params=params, timeout=30)
+            except requests.exceptions.RequestException as e:
+                print(f"    API error on {endpoint} (attempt {attempt + 1}): {e}")
+                time.sleep(2 ** attempt)
+                continue
+
+            with self.stats_lock:
+                self.bytes += len(response.content)
+
+            if response.status_code == 429 or response.status_code >= 500:
+                delay = float(response.headers.get("Retry-After", 2 ** attempt))
+                print(f"    {endpoint} returned {response.status_code}, retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+        raise RuntimeError(f"Giving up on {endpoint} after {MAX_RETRIES} attempts")
+
+    def fetch_body(self, topic):
+        """Download the first message of a topic into topic['full_body'] and ['attachments']"""
+        try:
+            data = self.api_get("gettopic", {"topic_id": topic['id']})
+        except requests.exceptions.HTTPError as e:
+            if not 400 <= e.response.status_code < 500:
+                raise
+            # Deleted or forbidden topic: archive it without a body and move on
+            print(f"    Skipping body of topic {topic['id']}: {e.response.status_code}")
+            data = None
+        if data and data.get("data"):
+            topic['full_body'] = data["data"][0].get("body", "")
+            attachments = message_attachments(data["data"][0])
+            if attachments:
+                topic['attachments'] = attachments
+        with self.stats_lock:
+            self.topics += 1
+        return topic
+
+    def save(self):
+        save_checkpoint(self.args.checkpoint, self.checkpoint)
+
+    def progress(self, state):
+        """Print throughput and an ETA across all groups"""
+        elapsed = max(time.time() - self.started, 1e-6)
+        with self.stats_lock:
+            topics_per_sec = self.topics / elapsed
+            bytes_per_sec = self.bytes / elapsed
+
+        remaining = sum(
+            max(g.get('total', 0) - g.get('done_topics', 0), 0)
+            for g in self.checkpoint['groups'].values() if not g.get('complete')
+        )
+        eta = format_duration(remaining / topics_per_sec) if topics_per_sec > 0 else "unknown"
+
+        print(f"  {state['name']}: {state['done_topics']:,}/{state.get('total', 0):,} topics"
+              f" · {topics_per_sec:.1f} topics/s · {format_bytes(bytes_per_sec)}/s · ETA {eta}")
+
+    def select_groups(self):
+        """Subscribed groups with archive access, optionally filtered by --groups"""
+        data = self.api_get("getsubs", None)
+        groups = [g for g in data.get("data", []) if g.get('perms', {}).get('archives_visible', False)]
+        if self.args.groups:
+            wanted = {int(g) for g in self.args.groups.split(',')}
+            groups = [g for g in groups if g['group_id'] in wanted]
+        return groups
+
+    def run(self):
+        groups = self.select_groups()
+        print(f"Backfilling {len(groups)} groups into {TOPIC_STORE_PATH}.dat/.heap and {SEARCH_INDEX_PATH}")
+
+        # Learn each group's size up front so the ETA covers the whole run
+        for group in groups:
+            state = self.checkpoint['groups'].setdefault(str(group['group_id']), {
+                "name": group['group_name'],
+                "done_topics": 0,
+                "next_page_token": None,
+                "complete": False,
+            })
+            if 'total' not in state:
+                data = self.api_get("gettopics", {"group_id": group['group_id'], "limit": 1})
+                state['total'] = data.get("total_count", 0)
+        self.save()
+
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            for group in groups:
+                self.backfill_group(group, pool)
+
+        elapsed = time.time() - self.started
+        print(f"\n✓ Backfill complete: {self.topics:,} topics, {format_bytes(self.bytes)}"
+              f" in {format_duration(elapsed)}")
+
+    def backfill_group(self, group, pool):
+        """Page through one group's history, saving a checkpoint after every page"""
+        state = self.checkpoint['groups'][str(group['group_id'])]
+        if state['complete']:
+            print(f"  ✓ {state['name']}: already complete")
+            return
+
+        while True:
+            params = {"group_id": group['group_id'], "limit": self.args.page_size}
+            if state['next_page_token']:
+                params["next_page_token"] = state['next_page_token']
+            data = self.api_get("gettopics", params)
+            topics = data.get("data", [])
+
+            for topic in topics:
+                topic['group_name'] = group['group_name']
+                topic['group_id_for_url'] = group['group_id']
+                topic['nice_group_name'] = group.get('nice_group_name', group['group_name'])
+
+            # Topics already archived at this version don't need their body again
+            missing = [t for t in topics if self.store.version(t['id']) != topic_archive_version(t)]
+            fetched = list(pool.map(self.fetch_body, missing))
+            self.store.put_topics(fetched)
+            self.index.add_topics(fetched)
+
+            state['done_topics'] += len(topics)
+            state['next_page_token'] = data.get("next_page_token")
+            state['complete'] = not data.get("has_more") or not state['next_page_token']
+            self.save()
+            self.progress(state)
+
+            if state['complete']:
+                break
+
+
+def topic_archive_version(topic):
+    """Version key comparable with TopicStore.version()"""
+    return (topic.get('updated') or topic.get('created'), topic.get('num_messages', 0))
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"groups": {}}
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so a crash never leaves it half-written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the local groups.io topic archive")
+    parser.add_argument("--groups", help="Comma-separated group ids (default: all with archive access)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel topic downloads")
+    parser.add_argument("--rate", type=float, default=5.0, help="Max API requests per second")
+    parser.add_argument("--page-size", type=int, default=100, help="Topics per gettopics page")
+    parser.add_argument("--checkpoint", default="backfill_checkpoint.json", help="Checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    if not API_KEY:
+        print("GROUPS_IO_API_KEY not found in environment variables. Please create a .env file.")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Groups.io Archive Backfill")
+    print("=" * 60)
+
+    backfill = Backfill(args)
+    try:
+        backfill.run()
+    except KeyboardInterrupt:
+        backfill.save()
+        print(f"\n\nInterrupted. Progress saved to {args.checkpoint}; run again to resume.")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
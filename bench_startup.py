@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for fastapi_rss_server
+
+Measures the two numbers that decide whether a cold start on Render/Railway
+passes its health check:
+
+1. Import time of fastapi_rss_server (python -X importtime), with the
+   slowest modules it pulls in.
+2. Time from launching the server process to the first successful
+   /feed.xml, served from a feed snapshot while the API is unreachable.
+
+Exits with status 1 if time to first feed exceeds --max-seconds.
+
+Usage:
+    python3 bench_startup.py [--runs 3] [--max-seconds 1.0] [--port 8123]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Builds a snapshot from synthetic topics, the same way a real refresh would
+SNAPSHOT_SCRIPT = """
+import fastapi_rss_server as srv
+topics = [{
+    'id': 1000 + i, 'group_name': 'parkslopeparents+Advice', 'subject': f'Topic {i}',
+    'summary': 'Looking for recommendations ' * 10, 'name': 'Bench', 'num_messages': 3,
+    'updated': '2026-01-12T19:35:47-08:00', 'full_body': '<p>' + 'Body text. ' * 200 + '</p>',
+} for i in range(100)]
+srv.cache_feed(srv.create_rss_feed(topics))
+srv.save_snapshot()
+"""
+
+
+def bench_env():
+    env = dict(os.environ)
+    env.update({
+        "GROUPS_IO_API_KEY": env.get("GROUPS_IO_API_KEY", "bench"),
+        "GROUPS_IO_BASE_URL": "http://127.0.0.1:9/api/v1",  # Unreachable: refreshes fail fast
+        "PYTHONPATH": REPO_DIR,
+        "FEED_USERNAME": "",
+        "FEED_PASSWORD": "",
+    })
+    return env
+
+
+def measure_import(workdir):
+    """Return (total seconds, [(seconds, module), ...] slowest first)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import fastapi_rss_server"],
+        cwd=workdir, env=bench_env(), capture_output=True, text=True, check=True,
+    )
+
+    # Children are listed before their parent, indented two more spaces
+    modules = []
+    children = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            seconds = int(cumulative) / 1_000_000
+        except ValueError:
+            continue  # Header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name.strip() == "fastapi_rss_server":
+                total, modules = seconds, children
+            children = []
+        elif depth == 1:
+            children.append((seconds, name.strip()))
+
+    modules.sort(reverse=True)
+    return total, modules
+
+
+def measure_first_feed(workdir, port, timeout=30):
+    """Launch the server and return seconds until /feed.xml returns 200"""
+    url = f"http://127.0.0.1:{port}/feed.xml"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fastapi_rss_server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=bench_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"/feed.xml not available after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fastapi_rss_server startup")
+    parser.add_argument("--runs", type=int, default=3, help="Server launches to measure")
+    parser.add_argument("--max-seconds", type=float, default=1.0, help="Fail if time to first feed exceeds this")
+    parser.add_argument("--port", type=int, default=8123, help="Port for the benchmark server")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("fastapi_rss_server Startup Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        import_total, modules = measure_import(workdir)
+        print(f"\nImport time: {import_total * 1000:.0f} ms")
+        for seconds, name in modules[:5]:
+            print(f"  {seconds * 1000:7.1f} ms  {name}")
+
+        subprocess.run([sys.executable, "-c", SNAPSHOT_SCRIPT], cwd=workdir, env=bench_env(),
+                       check=True, capture_output=True)
+
+        timings = [measure_first_feed(workdir, args.port) for _ in range(args.runs)]
+
+    median = statistics.median(timings)
+    print(f"\nTime to first /feed.xml: median {median * 1000:.0f} ms "
+          f"(runs: {', '.join(f'{t * 1000:.0f}' for t in timings)} ms)")
+
+    if median > args.max_seconds:
+        print(f"✗ Slower than {args.max_seconds:.2f}s target")
+        sys.exit(1)
+    print(f"✓ Within {args.max_seconds:.2f}s target")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,24 +15,40 @@ Usage:
 Access:
     http://localhost:8000/feed.xml
     http://localhost:8000/docs (API documentation)
+
+Startup is kept fast: the last published feed is restored from a snapshot on
+disk and served immediately, while the first refresh runs in the background.
+`requests` and `python-dotenv` are only imported when first needed.
 """
 
-from fastapi import FastAPI, Response, BackgroundTasks, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, Response, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-import requests
 from datetime import datetime
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom import minidom
+from xml.etree.ElementTree import Element, SubElement, indent, register_namespace, tostring
+import gzip
+import mmap
 import time
+from collections import deque
 from contextlib import asynccontextmanager
+from urllib.parse import parse_qs, urlencode, urlparse
 import asyncio
+import hashlib
+import hmac
+import json
 import os
+import re
 import secrets
-from dotenv import load_dotenv
+import threading
+from html import escape, unescape
+from media_cache import MediaCache, MediaTooLarge, iter_file, message_attachments, parse_range
+from search_index import SearchIndex
+from topic_store import TopicStore
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (deployments set them directly, so only parse .env if present)
+if os.path.exists('.env'):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Configuration
 API_KEY = os.getenv("GROUPS_IO_API_KEY")
@@ -44,21 +60,113 @@ FEED_USERNAME = os.getenv("FEED_USERNAME", "")
 FEED_PASSWORD = os.getenv("FEED_PASSWORD", "")
 AUTH_ENABLED = bool(FEED_USERNAME and FEED_PASSWORD)
 
-BASE_URL = "https://groups.io/api/v1"
+BASE_URL = os.getenv("GROUPS_IO_BASE_URL", "https://groups.io/api/v1")
 TOPICS_PER_GROUP = int(os.getenv("TOPICS_PER_GROUP", "10"))
-REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL_MINUTES", "30")) * 60  # Convert to seconds
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL_MINUTES", "30")) * 60  # Group list re-sync, in seconds
+
+# Adaptive per-group refresh: busy groups approach the minimum interval,
+# quiet ones back off to the maximum, all within an hourly API call budget
+MIN_REFRESH_INTERVAL = int(os.getenv("MIN_REFRESH_MINUTES", "5")) * 60
+MAX_REFRESH_INTERVAL = int(os.getenv("MAX_REFRESH_MINUTES", "240")) * 60
+API_BUDGET_PER_HOUR = int(os.getenv("API_BUDGET_PER_HOUR", "600"))
+SCHEDULER_TICK = 30  # Seconds between scheduler passes
+
+# Local archive: every fetched topic in a compact on-disk store, plus a search index
+TOPIC_STORE_PATH = os.getenv("TOPIC_STORE_PATH", "topics")
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.db")
+SEARCH_MAX_RESULTS = 100
+
+# Last published feed (XML, gzip variant and ETag), restored at startup
+FEED_SNAPSHOT_PATH = os.getenv("FEED_SNAPSHOT_PATH", "feed_snapshot")
 
-# Security
-security = HTTPBasic()
+# Per-user feeds at /feed/{token}.xml, each token mapped to a subscription filter
+FEED_TOKENS_FILE = os.getenv("FEED_TOKENS_FILE", "feed_tokens.json")
+FILTERED_FEED_SIZE = 50  # Items in each filtered feed
+FILTER_SCAN_LIMIT = 10000  # Most recent archived topics a filter looks through
+
+# Media proxy: attachments and inline images are fetched once and cached on disk
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "media_cache")
+MEDIA_CACHE_MAX_MB = int(os.getenv("MEDIA_CACHE_MAX_MB", "500"))
+MEDIA_MAX_FILE_MB = 50
+
+# Security (auto_error disabled so the feed stays public when auth is not configured)
+security = HTTPBasic(auto_error=False)
 
 # Feed metadata
 FEED_TITLE = "Park Slope Parents - All Groups"
 FEED_LINK = "https://groups.parkslopeparents.com"
 FEED_DESCRIPTION = "Recent topics from all my Park Slope Parents groups"
 
+# Public URL of this server, used for the feed's self and WebSub hub links.
+# Without it the feed has no self/hub links and the WebSub hub is disabled.
+SERVER_URL = os.getenv("SERVER_URL", "").rstrip('/')
+FEED_URL = f"{SERVER_URL}/feed.xml" if SERVER_URL else None
+HUB_URL = f"{SERVER_URL}/websub" if SERVER_URL else None
+
+# Push settings
+WEBSUB_SUBSCRIPTIONS_FILE = os.getenv("WEBSUB_SUBSCRIPTIONS_FILE", "websub_subscriptions.json")
+WEBSUB_DEFAULT_LEASE = 10 * 24 * 3600  # 10 days, in seconds
+WEBSUB_MAX_LEASE = 30 * 24 * 3600
+EVENT_QUEUE_SIZE = 16  # Pending events per /events client before it is dropped
+EVENT_KEEPALIVE = 25  # Seconds between SSE keepalive comments
+EVENT_STREAM_MAX_AGE = 10 * 60  # Seconds before an /events stream ends; the client reconnects and resumes
+SHUTDOWN_GRACE = 5  # Seconds uvicorn waits for open connections (like /events) on shutdown
+CHANGE_LOG_SIZE = 1000  # Changes kept for /changes and /events catch-up
+
+# Serialize Atom elements as atom:link rather than ns0:link
+register_namespace('atom', 'http://www.w3.org/2005/Atom')
+register_namespace('media', 'http://search.yahoo.com/mrss/')
+
+# Hosts whose images and attachments need the API key, so they go through /media
+MEDIA_HOSTS = {'groups.io', urlparse(BASE_URL).hostname, urlparse(FEED_LINK).hostname}
+MEDIA_SECRET = hashlib.sha256(f"media:{API_KEY}".encode('utf-8')).digest()
+IMG_SRC_PATTERN = re.compile(r'(<img\b[^>]*?\bsrc=)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
 # Cache
-feed_cache = {"xml": None, "last_updated": None}
+feed_cache = {
+    "xml": None,  # Latest XML string (only after a build in this process)
+    "body": None,  # Encoded feed served by /feed.xml: bytes, or a memoryview of the snapshot
+    "gzip": None,  # Gzip-compressed body
+    "etag": None,
+    "last_updated": None,
+    "generation": 0,
+    "cursor": 0,  # Cursor of the latest entry in change_log
+    "body_cursor": 0,  # Change cursor the cached body is current as of
+    "subscriptions_synced": 0,
+}
+http_session = None  # requests.Session, created on first API call
+
+# Per-token feeds
+feed_tokens = {"mtime": None, "by_hash": {}}  # by_hash maps sha256(token) to a filter key
+filtered_views = {}  # Maps filter key to {"generation", "body", "gzip", "etag"}
+view_locks = {}  # Maps filter key to the lock held while its view is rebuilt
+recent_archive = {"generation": None, "topics": []}  # Metadata of the newest archived topics, shared by all filters
+view_lock = threading.Lock()  # Guards view_locks and recent_archive
 group_alias_cache = {}  # Maps group_id to URL alias
+published_versions = {}  # Maps topic id to (updated, num_messages, content digest) from the last build
+change_log = deque(maxlen=CHANGE_LOG_SIZE)  # Recent changes, oldest first: {"cursor", "type", "id", "item" or "fields"}
+change_log_file = {"lines": 0}  # Changes appended to the .changes.jsonl file since it was last compacted
+change_lock = threading.Lock()  # Keeps change_log and feed_cache['cursor'] consistent for readers
+topics_by_group = {}  # Maps group_id to its latest topics, with full bodies
+item_cache = {}  # Maps topic id to (render key, rendered <item> element)
+page_cache = {}  # Maps page name to (render key, encoded HTML) for / and /reader
+
+# Refresh scheduling
+group_schedule = {}  # Maps group_id to {"group", "rate", "interval", "next_refresh", "cost", "failures"}
+api_call_times = deque()  # Timestamps of groups.io calls made in the last hour
+api_calls_lock = threading.Lock()  # Guards api_call_times, which /status prunes from the event loop
+refresh_lock = threading.Lock()  # Serializes full and scheduled refreshes
+
+topic_store = TopicStore(TOPIC_STORE_PATH, writable=True)
+search_index = SearchIndex(SEARCH_INDEX_PATH)
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_MB * 1024 * 1024, MEDIA_MAX_FILE_MB * 1024 * 1024)
+
+# Push subscribers
+websub_subscribers = {}  # Maps callback URL to {"secret": ..., "expires": ...}
+websub_outbox = {"xml": None}  # Latest feed waiting for WebSub delivery
+websub_ready = threading.Event()  # Wakes the WebSub delivery worker
+event_subscribers = set()  # One asyncio.Queue per connected /events client
+event_loop = None  # Set at startup so worker threads can hand events to the loop
 
 
 def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
@@ -67,6 +175,13 @@ def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
         # If auth is not configured, allow access
         return True
 
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+
     correct_username = secrets.compare_digest(credentials.username, FEED_USERNAME)
     correct_password = secrets.compare_digest(credentials.password, FEED_PASSWORD)
 
@@ -79,13 +194,24 @@ def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
     return True
 
 
+def get_http_session():
+    """Shared requests session; requests is imported on first use to keep startup fast"""
+    global http_session
+    if http_session is None:
+        import requests
+        http_session = requests.Session()
+    return http_session
+
+
 def make_api_request(endpoint, params=None):
     """Make an authenticated API request to groups.io"""
     headers = {"Authorization": f"Bearer {API_KEY}"}
     url = f"{BASE_URL}/{endpoint}"
+    with api_calls_lock:
+        api_call_times.append(time.time())
 
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = get_http_session().get(url, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -101,7 +227,7 @@ def get_subscriptions():
     # Cache group aliases for correct URL generation
     for group in groups:
         group_id = group['group_id']
-        if group_id not in group_alias_cache:
+        if group_id not in group_alias_cache and within_budget(1):
             group_info = make_api_request("getgroup", {"group_id": group_id})
             if group_info and 'group_url' in group_info:
                 # Extract alias from URL (e.g., .../g/Advice -> Advice)
@@ -113,20 +239,19 @@ def get_subscriptions():
 
 
 def get_topics(group_id, group_name, limit=10):
-    """Get recent topics from a specific group"""
+    """Get recent topics from a specific group (None if the request failed)"""
     params = {"group_id": group_id, "limit": limit}
     data = make_api_request("gettopics", params)
-    return data.get("data", []) if data else []
+    return data.get("data", []) if data else None
 
 
-def get_topic_full_content(topic_id):
-    """Get the full content of the first message in a topic"""
+def get_first_message(topic_id):
+    """Get the first message of a topic (body and attachments)"""
     params = {"topic_id": topic_id}
     data = make_api_request("gettopic", params)
 
     if data and "data" in data and len(data["data"]) > 0:
-        first_message = data["data"][0]
-        return first_message.get("body", "")
+        return data["data"][0]
     return None
 
 
@@ -151,122 +276,700 @@ def parse_iso_date(date_string):
     return datetime.now()
 
 
-def create_rss_feed(all_topics):
+def topic_link(topic):
+    """Build the web URL of a topic"""
+    # Get the correct URL alias from cache
+    group_id = topic.get('group_id_for_url')
+    group_alias = group_alias_cache.get(group_id, topic['group_name'].split('+')[-1])
+    return f"https://groups.parkslopeparents.com/g/{group_alias}/topic/{topic['id']}"
+
+
+def needs_media_proxy(url):
+    """Whether a URL points at groups.io content that readers can't load themselves"""
+    parsed = urlparse(url)
+    return parsed.scheme in ('http', 'https') and (
+        parsed.hostname in MEDIA_HOSTS or (parsed.hostname or '').endswith('.groups.io'))
+
+
+def media_url(url, content_type=None, thumbnail=False):
+    """Register a URL with the media cache and return its /media proxy URL.
+
+    The id is an HMAC of the source URL, so it can't be guessed and doubles
+    as the credential, like feed tokens.
+    """
+    media_id = hmac.new(MEDIA_SECRET, url.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+    media_cache.register(media_id, url, content_type)
+    return f"{SERVER_URL}/media/{media_id}" + ("?thumb=1" if thumbnail else "")
+
+
+def too_large_to_proxy(attachment):
+    return attachment['size'] > MEDIA_MAX_FILE_MB * 1024 * 1024
+
+
+def attachment_url(attachment):
+    """Media proxy URL of an attachment, or its original URL if it is too large to proxy"""
+    if too_large_to_proxy(attachment):
+        return attachment['url']
+    return media_url(attachment['url'], attachment['type'])
+
+
+def proxy_images(html):
+    """Point groups.io <img> tags at the media proxy; returns (html, first image URL)"""
+    images = []
+
+    def replace(match):
+        url = unescape(match.group(3))
+        if not needs_media_proxy(url):
+            return match.group(0)
+        images.append(url)
+        return f'{match.group(1)}{match.group(2)}{media_url(url)}{match.group(2)}'
+
+    return IMG_SRC_PATTERN.sub(replace, html), (images[0] if images else None)
+
+
+def build_item(topic):
+    """Build the RSS item fields for a topic"""
+    topic_url = topic_link(topic)
+
+    # Get full message content, with images served through the media proxy
+    # (only when this server has a public URL to serve them from)
+    full_content = topic.get('full_body')
+    first_image = None
+    if full_content and SERVER_URL:
+        full_content, first_image = proxy_images(full_content)
+
+    # Attachments: the first becomes the enclosure, all are linked in the description
+    attachments = []
+    if SERVER_URL:
+        attachments = [a for a in topic.get('attachments') or [] if needs_media_proxy(a['url'])]
+    enclosure = None
+    if attachments:
+        enclosure = {
+            "url": attachment_url(attachments[0]),
+            "type": attachments[0]['type'],
+            "length": attachments[0]['size'],
+        }
+        if first_image is None:
+            first_image = next((a['url'] for a in attachments
+                                if a['type'].startswith('image/') and not too_large_to_proxy(a)), None)
+    thumbnail = media_url(first_image, thumbnail=True) if first_image else None
+
+    if full_content:
+        # Clean preview from summary
+        summary = html_to_text(topic.get('summary', ''))
+        if len(summary) > 200:
+            summary = summary[:200] + "..."
+
+        # Metadata header
+        meta = f"<p><em>Posted by {topic.get('name', 'Unknown')}"
+        if topic.get('num_messages', 0) > 1:
+            meta += f" • {topic.get('num_messages', 0)} replies"
+        if topic.get('has_attachments'):
+            meta += " • 📎 Attachments"
+        meta += "</em></p>"
+
+        # Build description with preview and collapsible full content
+        desc = meta
+        desc += f"<p><strong>Preview:</strong> {summary}</p>"
+        desc += f"<details><summary><strong>▶ Read full message</strong></summary><hr>{full_content}</details>"
+        if attachments:
+            links = ", ".join(
+                f'<a href="{attachment_url(a)}">{escape(a["filename"] or "attachment")}</a>'
+                for a in attachments
+            )
+            desc += f"<p>📎 {links}</p>"
+    else:
+        # Fallback to summary if full content not available
+        summary = html_to_text(topic.get('summary', ''))
+        if len(summary) > 500:
+            summary = summary[:500] + "..."
+        desc = f"{summary}\n\nPosted by: {topic.get('name', 'Unknown')}\nMessages: {topic.get('num_messages', 0)}"
+        if topic.get('has_attachments'):
+            desc += "\nHas attachments"
+
+    return {
+        "id": topic['id'],
+        "title": f"[{topic['group_name']}] {topic['subject']}",
+        "link": topic_url,
+        "description": desc,
+        "pubDate": format_pub_date(topic),
+        "author": topic.get('name', 'Unknown'),
+        "category": topic['group_name'],
+        "enclosure": enclosure,
+        "thumbnail": thumbnail,
+        "num_messages": topic.get('num_messages', 0),
+    }
+
+
+def format_pub_date(topic):
+    pub_date = parse_iso_date(topic.get('updated') or topic.get('created'))
+    return pub_date.strftime('%a, %d %b %Y %H:%M:%S %z')
+
+
+def topic_version(topic):
+    """Identify a revision of a topic: new replies or edits change it"""
+    return (topic.get('updated') or topic.get('created'), topic.get('num_messages', 0))
+
+
+def content_digest(topic):
+    """Hash of what a topic's item shows besides its date and reply count"""
+    content = [topic.get(key) for key in
+               ('group_name', 'subject', 'name', 'summary', 'full_body', 'attachments', 'has_attachments')]
+    return hashlib.sha1(json.dumps(content).encode('utf-8')).hexdigest()[:16]
+
+
+def render_item(topic):
+    """Return the <item> element for a topic, reusing the cached one if unchanged"""
+    render_key = (
+        topic_version(topic),
+        topic.get('full_body') is not None,
+        group_alias_cache.get(topic.get('group_id_for_url')),
+        # Re-render daily so the item's media ids stay registered (see MediaCache)
+        int(time.time() // 86400) if SERVER_URL else None,
+    )
+    cached = item_cache.get(topic['id'])
+    if cached and cached[0] == render_key:
+        return cached[1]
+
+    fields = build_item(topic)
+    item = Element('item')
+
+    SubElement(item, 'title').text = fields['title']
+    SubElement(item, 'link').text = fields['link']
+    SubElement(item, 'description').text = fields['description']
+    SubElement(item, 'pubDate').text = fields['pubDate']
+
+    guid = SubElement(item, 'guid')
+    guid.set('isPermaLink', 'true')
+    guid.text = fields['link']
+
+    SubElement(item, 'author').text = fields['author']
+    SubElement(item, 'category').text = fields['category']
+
+    if fields['enclosure']:
+        enclosure = SubElement(item, 'enclosure')
+        enclosure.set('url', fields['enclosure']['url'])
+        enclosure.set('length', str(fields['enclosure']['length']))
+        enclosure.set('type', fields['enclosure']['type'])
+    if fields['thumbnail']:
+        SubElement(item, '{http://search.yahoo.com/mrss/}thumbnail').set('url', fields['thumbnail'])
+
+    item_cache[topic['id']] = (render_key, item)
+    return item
+
+
+def create_rss_feed(all_topics, title=FEED_TITLE, self_url=FEED_URL, hub_url=HUB_URL):
     """Generate RSS 2.0 XML from topics"""
     rss = Element('rss')
     rss.set('version', '2.0')
-    rss.set('xmlns:atom', 'http://www.w3.org/2005/Atom')
 
     channel = SubElement(rss, 'channel')
 
     # Channel metadata
-    SubElement(channel, 'title').text = FEED_TITLE
+    SubElement(channel, 'title').text = title
     SubElement(channel, 'link').text = FEED_LINK
     SubElement(channel, 'description').text = FEED_DESCRIPTION
     SubElement(channel, 'language').text = 'en-us'
     SubElement(channel, 'lastBuildDate').text = datetime.now().strftime('%a, %d %b %Y %H:%M:%S %z')
 
     # Add self-reference
-    atom_link = SubElement(channel, '{http://www.w3.org/2005/Atom}link')
-    atom_link.set('href', f'{FEED_LINK}/feed.xml')
-    atom_link.set('rel', 'self')
-    atom_link.set('type', 'application/rss+xml')
+    if self_url:
+        atom_link = SubElement(channel, '{http://www.w3.org/2005/Atom}link')
+        atom_link.set('href', self_url)
+        atom_link.set('rel', 'self')
+        atom_link.set('type', 'application/rss+xml')
+
+    # Advertise the WebSub hub so readers can subscribe instead of polling
+    if hub_url:
+        hub_link = SubElement(channel, '{http://www.w3.org/2005/Atom}link')
+        hub_link.set('href', hub_url)
+        hub_link.set('rel', 'hub')
+
+    # Add items, re-rendering only topics that changed since the last build
+    for topic in all_topics:
+        channel.append(render_item(topic))
+
+    # Pretty print
+    indent(rss, space="  ")
+    xml_string = '<?xml version="1.0" ?>\n' + tostring(rss, encoding='unicode') + '\n'
+
+    # Media ids in any feed (main, search, token views) must resolve after a restart
+    media_cache.save_index()
+    return xml_string
+
 
-    # Add items
+def diff_topics(all_topics):
+    """Compare topics with the last build by id and version.
+
+    Each change is "added" (new in the feed), "replies" (num_messages went
+    up), "updated" (edited) or "removed" (dropped out of the feed). Added
+    topics and ones whose content changed carry the RSS item fields; when
+    only the date and reply count moved, just those are sent as "fields".
+    """
+    changes = []
+    current_versions = {}
     for topic in all_topics:
-        item = SubElement(channel, 'item')
-
-        SubElement(item, 'title').text = f"[{topic['group_name']}] {topic['subject']}"
-
-        # Get the correct URL alias from cache
-        group_id = topic.get('group_id_for_url')
-        group_alias = group_alias_cache.get(group_id, topic['group_name'].split('+')[-1])
-        topic_url = f"https://groups.parkslopeparents.com/g/{group_alias}/topic/{topic['id']}"
-        SubElement(item, 'link').text = topic_url
-
-        # Get full message content
-        full_content = topic.get('full_body')
-
-        if full_content:
-            # Clean preview from summary
-            summary = html_to_text(topic.get('summary', ''))
-            if len(summary) > 200:
-                summary = summary[:200] + "..."
-
-            # Metadata header
-            meta = f"<p><em>Posted by {topic.get('name', 'Unknown')}"
-            if topic.get('num_messages', 0) > 1:
-                meta += f" • {topic.get('num_messages', 0)} replies"
-            if topic.get('has_attachments'):
-                meta += " • 📎 Attachments"
-            meta += "</em></p>"
-
-            # Build description with preview and collapsible full content
-            desc = meta
-            desc += f"<p><strong>Preview:</strong> {summary}</p>"
-            desc += f"<details><summary><strong>▶ Read full message</strong></summary><hr>{full_content}</details>"
+        version = topic_version(topic)
+        digest = content_digest(topic)
+        current_versions[topic['id']] = version + (digest,)
+        previous = published_versions.get(topic['id'])
+        if previous is not None and previous[:2] == version:
+            continue
+        if previous is None:
+            change_type = "added"
+        elif version[1] > previous[1]:
+            change_type = "replies"
         else:
-            # Fallback to summary if full content not available
-            summary = html_to_text(topic.get('summary', ''))
-            if len(summary) > 500:
-                summary = summary[:500] + "..."
-            desc = f"{summary}\n\nPosted by: {topic.get('name', 'Unknown')}\nMessages: {topic.get('num_messages', 0)}"
-            if topic.get('has_attachments'):
-                desc += "\nHas attachments"
+            change_type = "updated"
 
-        SubElement(item, 'description').text = desc
+        change = {"type": change_type, "id": topic['id']}
+        if previous is not None and previous[2:] == (digest,):
+            change['fields'] = {"pubDate": format_pub_date(topic), "num_messages": version[1]}
+        else:
+            change['item'] = build_item(topic)
+        changes.append(change)
 
-        pub_date = parse_iso_date(topic.get('updated') or topic.get('created'))
-        SubElement(item, 'pubDate').text = pub_date.strftime('%a, %d %b %Y %H:%M:%S %z')
+    for topic_id in published_versions:
+        if topic_id not in current_versions:
+            changes.append({"type": "removed", "id": topic_id})
 
-        guid = SubElement(item, 'guid')
-        guid.set('isPermaLink', 'true')
-        guid.text = topic_url
+    published_versions.clear()
+    published_versions.update(current_versions)
+    return changes
 
-        SubElement(item, 'author').text = topic.get('name', 'Unknown')
-        SubElement(item, 'category').text = topic['group_name']
 
-    # Pretty print
-    xml_string = minidom.parseString(tostring(rss)).toprettyxml(indent="  ")
-    return xml_string
+def record_changes(changes):
+    """Give each change the next cursor and append it to the change log"""
+    with change_lock:
+        for change in changes:
+            change['cursor'] = feed_cache['cursor'] + 1
+            change_log.append(change)
+            feed_cache['cursor'] = change['cursor']
+    return changes
 
 
-def generate_feed():
-    """Generate the RSS feed and cache it"""
-    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Generating RSS feed...")
+def changes_since(since):
+    """Compact delta of everything after a cursor, one entry per topic.
 
-    groups = get_subscriptions()
-    if not groups:
-        print("No groups found")
-        return None
+    "reset" means the cursor is unknown or older than the change log, so the
+    consumer has to re-read the full feed and continue from "cursor".
+    """
+    with change_lock:
+        cursor = feed_cache['cursor']
+        log = list(change_log)
+    oldest = log[0]['cursor'] if log else cursor + 1
+    if since > cursor or since < oldest - 1:
+        return {"cursor": cursor, "reset": True, "changes": []}
+
+    merged = {}
+    for change in log:
+        if change['cursor'] <= since:
+            continue
+        # Keep only the latest change per topic, but a topic the consumer has
+        # never seen stays "added" (or disappears if it was removed again)
+        previous = merged.pop(change['id'], None)
+        if previous is not None:
+            if previous['type'] == "added" and change['type'] == "removed":
+                continue
+            if 'fields' in change and 'item' in previous:
+                # Don't lose the earlier item: apply the new date and reply count to it
+                change = {"type": change['type'], "id": change['id'], "cursor": change['cursor'],
+                          "item": dict(previous['item'], **change['fields'])}
+            if previous['type'] == "added":
+                change = dict(change, type="added")
+        merged[change['id']] = change
+
+    return {"cursor": cursor, "reset": False, "changes": list(merged.values())}
+
+
+def load_websub_subscribers():
+    """Load persisted WebSub subscriptions, dropping expired ones"""
+    try:
+        with open(WEBSUB_SUBSCRIPTIONS_FILE, 'r') as f:
+            subscribers = json.load(f)
+    except (OSError, ValueError):
+        return
 
-    all_topics = []
+    now = time.time()
+    for callback, sub in subscribers.items():
+        if sub.get('expires', 0) > now:
+            websub_subscribers[callback] = sub
+
+
+def save_websub_subscribers():
+    """Persist WebSub subscriptions so they survive restarts"""
+    try:
+        with open(WEBSUB_SUBSCRIPTIONS_FILE, 'w') as f:
+            json.dump(websub_subscribers, f)
+    except OSError as e:
+        print(f"  ✗ Could not save WebSub subscriptions: {e}")
+
+
+def verify_websub_intent(mode, callback, lease_seconds, secret):
+    """Confirm a (un)subscription with the subscriber, as required by WebSub"""
+    challenge = secrets.token_urlsafe(24)
+    params = {
+        "hub.mode": mode,
+        "hub.topic": FEED_URL,
+        "hub.challenge": challenge,
+    }
+    if mode == "subscribe":
+        params["hub.lease_seconds"] = lease_seconds
+
+    try:
+        response = get_http_session().get(callback, params=params, timeout=10)
+    except Exception as e:
+        print(f"  ✗ WebSub verification failed for {callback}: {e}")
+        return
+
+    if not (200 <= response.status_code < 300) or response.text.strip() != challenge:
+        print(f"  ✗ WebSub subscriber {callback} did not confirm {mode}")
+        return
+
+    if mode == "subscribe":
+        websub_subscribers[callback] = {"secret": secret, "expires": time.time() + lease_seconds}
+        print(f"  ✓ WebSub subscriber added: {callback}")
+    else:
+        websub_subscribers.pop(callback, None)
+        print(f"  ✓ WebSub subscriber removed: {callback}")
+    save_websub_subscribers()
+
+
+def notify_websub_subscribers(xml):
+    """Deliver the updated feed to every WebSub subscriber"""
+    if not websub_subscribers or HUB_URL is None:
+        return
+
+    body = xml.encode('utf-8')
+    link_header = f'<{HUB_URL}>; rel="hub", <{FEED_URL}>; rel="self"'
+    now = time.time()
+    expired = False
+
+    for callback, sub in list(websub_subscribers.items()):
+        if sub['expires'] <= now:
+            websub_subscribers.pop(callback, None)
+            expired = True
+            continue
+
+        headers = {"Content-Type": "application/rss+xml", "Link": link_header}
+        if sub.get('secret'):
+            signature = hmac.new(sub['secret'].encode('utf-8'), body, hashlib.sha256).hexdigest()
+            headers["X-Hub-Signature"] = f"sha256={signature}"
+
+        try:
+            response = get_http_session().post(callback, data=body, headers=headers, timeout=10)
+            if response.status_code == 410:
+                # Subscriber is gone for good
+                websub_subscribers.pop(callback, None)
+                expired = True
+        except Exception as e:
+            print(f"  ✗ WebSub delivery to {callback} failed: {e}")
+
+    if expired:
+        save_websub_subscribers()
+    print(f"  ✓ Notified {len(websub_subscribers)} WebSub subscribers")
+
+
+def queue_websub_notification(xml):
+    """Hand the latest feed to the delivery worker; a newer feed replaces an undelivered one"""
+    websub_outbox['xml'] = xml
+    websub_ready.set()
+
+
+def websub_delivery_worker():
+    """Deliver WebSub notifications outside the refresh, so slow callbacks don't stall it"""
+    while True:
+        websub_ready.wait()
+        websub_ready.clear()
+        xml, websub_outbox['xml'] = websub_outbox['xml'], None
+        if xml is None:
+            continue
+        try:
+            notify_websub_subscribers(xml)
+        except Exception as e:
+            print(f"  ✗ WebSub notification failed: {e}")
+
+
+def deliver_event(event):
+    """Queue an event for every /events client (runs on the event loop)"""
+    for queue in list(event_subscribers):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop it, EventSource will reconnect and catch up from its cursor
+            event_subscribers.discard(queue)
+
+
+def broadcast_event(event):
+    """Hand an event to the event loop from any thread"""
+    if event_loop is not None and event_subscribers:
+        event_loop.call_soon_threadsafe(deliver_event, event)
+
+
+def publish_update(xml, changes):
+    """Push a build's changes to WebSub subscribers and /events clients"""
+    broadcast_event({
+        "cursor": feed_cache['cursor'],
+        "reset": False,
+        "lastBuildDate": feed_cache['last_updated'].isoformat(),
+        "changes": changes,
+    })
+    queue_websub_notification(xml)
+
+
+def estimate_post_rate(topics):
+    """Estimate posts per hour from how far back the recent topic updates reach"""
+    timestamps = [
+        parse_iso_date(t.get('updated') or t.get('created')).timestamp()
+        for t in topics if not t.get('is_sticky')
+    ]
+    if not timestamps:
+        return 0.0
+
+    # Measure up to now so a group that has gone silent looks quiet
+    span_hours = max(time.time() - min(timestamps), 60) / 3600
+    return len(timestamps) / span_hours
+
+
+def schedule_interval(rate):
+    """Pick a refresh interval that expects about one new post per refresh"""
+    if rate <= 0:
+        return MAX_REFRESH_INTERVAL
+    return int(max(MIN_REFRESH_INTERVAL, min(3600 / rate, MAX_REFRESH_INTERVAL)))
+
+
+def api_calls_last_hour():
+    """Count groups.io calls made in the last hour"""
+    cutoff = time.time() - 3600
+    with api_calls_lock:
+        while api_call_times and api_call_times[0] < cutoff:
+            api_call_times.popleft()
+        return len(api_call_times)
+
+
+def within_budget(cost):
+    """Whether `cost` more groups.io calls fit in the hourly API budget"""
+    return api_calls_last_hour() + cost <= API_BUDGET_PER_HOUR
+
+
+def sync_groups(groups):
+    """Track newly accessible groups and forget ones we no longer see"""
+    accessible = {}
     for group in groups:
-        if not group.get('perms', {}).get('archives_visible', False):
+        if group.get('perms', {}).get('archives_visible', False):
+            accessible[group['group_id']] = group
+
+    for group_id in list(group_schedule):
+        if group_id not in accessible:
+            del group_schedule[group_id]
+            topics_by_group.pop(group_id, None)
+
+    for group_id, group in accessible.items():
+        entry = group_schedule.setdefault(group_id, {
+            "rate": 0.0,
+            "interval": REFRESH_INTERVAL,
+            "next_refresh": 0.0,
+            "cost": 1 + TOPICS_PER_GROUP,
+            "failures": 0,
+            "group": group,  # Set before the entry is visible to /status
+        })
+        entry['group'] = group
+
+    return list(accessible.values())
+
+
+def refresh_group(group):
+    """Fetch one group's topics, downloading bodies only for new or edited topics.
+
+    Returns True if the group's topic set changed.
+    """
+    group_id = group['group_id']
+    group_name = group['group_name']
+    calls_before = api_calls_last_hour()
+
+    topics = get_topics(group_id, group_name, TOPICS_PER_GROUP)
+    entry = group_schedule.get(group_id)
+    if topics is None:
+        # Keep the previous topics and retry soon, backing off on repeated
+        # failures; an empty sample says nothing about the posting rate
+        if entry is not None:
+            entry['failures'] += 1
+            retry = min(MIN_REFRESH_INTERVAL * 2 ** (entry['failures'] - 1), entry['interval'])
+            entry['next_refresh'] = time.time() + retry
+            print(f"  ✗ {group_name}: fetch failed, retrying in {retry // 60} minutes")
+        return False
+
+    previous = {t['id']: t for t in topics_by_group.get(group_id, [])}
+    fetched = 0
+
+    for topic in topics:
+        topic['group_name'] = group_name
+        topic['group_id_for_url'] = group_id  # Store for URL generation
+        topic['nice_group_name'] = group.get('nice_group_name', group_name)
+
+        # The body is the first message, so new replies don't change it; only an
+        # update without a new message (an edit) needs a re-download
+        old = previous.get(topic['id'])
+        if old and old.get('full_body') and (
+            old.get('updated') == topic.get('updated')
+            or old.get('num_messages', 0) != topic.get('num_messages', 0)
+        ):
+            topic['full_body'] = old['full_body']
+            if old.get('attachments'):
+                topic['attachments'] = old['attachments']
             continue
 
-        group_id = group['group_id']
-        group_name = group['group_name']
+        message = get_first_message(topic['id'])
+        fetched += 1
+        if message and message.get('body'):
+            topic['full_body'] = message['body']
+        if message and message.get('attachments'):
+            topic['attachments'] = message_attachments(message)
+
+    changed = [topic_version(t) for t in topics] != [topic_version(t) for t in previous.values()]
+    topics_by_group[group_id] = topics
+    if changed:
+        topic_store.put_topics(topics)
+        search_index.add_topics(topics)
+
+    # Reschedule from the observed posting rate, smoothed against the last estimate
+    if entry is not None:
+        entry['failures'] = 0
+        rate = estimate_post_rate(topics)
+        entry['rate'] = rate if not entry['rate'] else 0.5 * entry['rate'] + 0.5 * rate
+        entry['interval'] = schedule_interval(entry['rate'])
+        entry['next_refresh'] = time.time() + entry['interval']
+        entry['cost'] = max(1, api_calls_last_hour() - calls_before)
+
+    print(f"  ✓ {group_name}: {len(topics)} topics ({fetched} bodies fetched)")
+    return changed
+
+
+def encode_feed(xml):
+    """Encode feed XML with its gzip variant and ETag"""
+    body = xml.encode('utf-8')
+    return {
+        "body": body,
+        "gzip": gzip.compress(body, compresslevel=6, mtime=0),
+        "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+    }
+
 
-        topics = get_topics(group_id, group_name, TOPICS_PER_GROUP)
+def cache_feed(xml):
+    """Cache a freshly built feed with its ETag and gzip variant"""
+    feed_cache.update(encode_feed(xml))
+    # Set after the body, so a reader never pairs a new cursor with an old body
+    feed_cache['body_cursor'] = feed_cache['cursor']
+    feed_cache['xml'] = xml
+    feed_cache['last_updated'] = datetime.now()
+    feed_cache['generation'] += 1
 
-        for topic in topics:
-            topic['group_name'] = group_name
-            topic['group_id_for_url'] = group_id  # Store for URL generation
-            topic['nice_group_name'] = group.get('nice_group_name', group_name)
 
-        all_topics.extend(topics)
-        print(f"  ✓ {group_name}: {len(topics)} topics")
+def write_atomically(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
 
-    # Fetch full content for each topic
-    print(f"\n  Fetching full content for {len(all_topics)} topics...")
-    for i, topic in enumerate(all_topics, 1):
-        full_body = get_topic_full_content(topic['id'])
-        if full_body:
-            topic['full_body'] = full_body
-            print(f"    ✓ {i}/{len(all_topics)}: {topic['subject'][:50]}...")
+
+def save_snapshot():
+    """Persist the published feed so the next startup can serve it immediately"""
+    if feed_cache['xml'] is None:
+        # Nothing built since startup; the snapshot on disk is already current
+        return
+    try:
+        write_atomically(f"{FEED_SNAPSHOT_PATH}.xml", feed_cache['body'])
+        write_atomically(f"{FEED_SNAPSHOT_PATH}.xml.gz", feed_cache['gzip'])
+        write_atomically(f"{FEED_SNAPSHOT_PATH}.json", json.dumps({
+            "etag": feed_cache['etag'],
+            "last_updated": feed_cache['last_updated'].isoformat(),
+        }).encode('utf-8'))
+        # Versions, so diffs and cursors continue across restarts (the change
+        # log itself is appended to .changes.jsonl as it grows)
+        write_atomically(f"{FEED_SNAPSHOT_PATH}.changes.json", json.dumps({
+            "cursor": feed_cache['cursor'],
+            "versions": published_versions,
+        }).encode('utf-8'))
+    except OSError as e:
+        print(f"  ✗ Could not save feed snapshot: {e}")
+
+
+def save_changes(changes):
+    """Append a build's changes to the change log file, one JSON line each.
+
+    Once the file holds twice the log's size, it is rewritten with just the
+    changes still in the log.
+    """
+    path = f"{FEED_SNAPSHOT_PATH}.changes.jsonl"
+    try:
+        if change_log_file['lines'] + len(changes) > 2 * CHANGE_LOG_SIZE:
+            write_atomically(path, "".join(json.dumps(c) + "\n" for c in change_log).encode('utf-8'))
+            change_log_file['lines'] = len(change_log)
         else:
-            print(f"    ✗ {i}/{len(all_topics)}: Failed to fetch content")
+            with open(path, 'a') as f:
+                f.write("".join(json.dumps(c) + "\n" for c in changes))
+            change_log_file['lines'] += len(changes)
+    except OSError as e:
+        print(f"  ✗ Could not save change log: {e}")
+
+
+def load_snapshot():
+    """Memory-map the last published feed; returns False if there is none"""
+    try:
+        with open(f"{FEED_SNAPSHOT_PATH}.json", 'r') as f:
+            meta = json.load(f)
+        with open(f"{FEED_SNAPSHOT_PATH}.xml", 'rb') as f:
+            body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(f"{FEED_SNAPSHOT_PATH}.xml.gz", 'rb') as f:
+            gzipped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return False
+
+    feed_cache['body'] = memoryview(body)
+    feed_cache['gzip'] = memoryview(gzipped)
+    feed_cache['etag'] = meta['etag']
+    feed_cache['last_updated'] = datetime.fromisoformat(meta['last_updated'])
+
+    try:
+        with open(f"{FEED_SNAPSHOT_PATH}.changes.json", 'r') as f:
+            changes = json.load(f)
+    except (OSError, ValueError):
+        return True  # Consumers holding old cursors will get a reset
+    published_versions.update({int(k): tuple(v) for k, v in changes['versions'].items()})
+    if changes.get('log'):
+        # Written by older versions: move it to .changes.jsonl on the next save
+        change_log.extend(changes['log'])
+        change_log_file['lines'] = 2 * CHANGE_LOG_SIZE
+    try:
+        with open(f"{FEED_SNAPSHOT_PATH}.changes.jsonl", 'r') as f:
+            for line in f:
+                try:
+                    change_log.append(json.loads(line))
+                except ValueError:
+                    continue  # Torn line from a crash
+                change_log_file['lines'] += 1
+    except OSError:
+        pass
+    # The log can be a build ahead of the snapshot if we stopped in between
+    feed_cache['body_cursor'] = changes['cursor']
+    feed_cache['cursor'] = max(changes['cursor'], change_log[-1]['cursor'] if change_log else 0)
+    return True
+
+
+def load_topics_from_store():
+    """Seed each group's latest topics from the topic store, so the first
+    refresh only downloads bodies for topics that changed while we were down"""
+    for group_id in topic_store.group_ids():
+        topics = [topic_store.get(topic_id) for topic_id in topic_store.recent_ids(TOPICS_PER_GROUP, group_id)]
+        topics_by_group[group_id] = topics
+    print(f"  ✓ Loaded {len(topic_store)} archived topics from {TOPIC_STORE_PATH}")
+
+
+def rebuild_feed():
+    """Rebuild the cached feed from the latest topics of every tracked group"""
+    all_topics = []
+    for group_id in group_schedule:
+        all_topics.extend(topics_by_group.get(group_id, []))
 
     # Sort by most recent
     all_topics.sort(key=lambda x: x.get('updated') or x.get('created'), reverse=True)
@@ -274,38 +977,291 @@ def generate_feed():
     # Generate XML
     xml = create_rss_feed(all_topics)
 
+    # Drop rendered items that fell out of the feed
+    current_ids = {topic['id'] for topic in all_topics}
+    for topic_id in list(item_cache):
+        if topic_id not in current_ids:
+            del item_cache[topic_id]
+
+    # Diff against the previous build and log the changes
+    changes = record_changes(diff_topics(all_topics))
+    if changes:
+        save_changes(changes)
+
     # Cache it
-    feed_cache['xml'] = xml
-    feed_cache['last_updated'] = datetime.now()
+    cache_feed(xml)
+    save_snapshot()
 
     print(f"  ✓ Feed generated with {len(all_topics)} total topics")
+
+    # Push only what changed since the previous build
+    if changes:
+        publish_update(xml, changes)
+        counts = {}
+        for change in changes:
+            counts[change['type']] = counts.get(change['type'], 0) + 1
+        summary = ", ".join(f"{count} {change_type}" for change_type, count in counts.items())
+        print(f"  ✓ Pushed {len(changes)} changes ({summary}), cursor {feed_cache['cursor']}")
+
     return xml
 
 
-async def refresh_feed_periodically():
-    """Background task to refresh feed every 30 minutes"""
-    while True:
-        await asyncio.sleep(REFRESH_INTERVAL)
+def generate_feed():
+    """Refresh every group, then regenerate the RSS feed and cache it.
+
+    Skipped if a refresh is already running: that one will publish the
+    latest topics anyway, and waiting would tie up a worker thread.
+    """
+    if not refresh_lock.acquire(blocking=False):
+        print("Refresh already running, skipping")
+        return None
+    try:
+        print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Generating RSS feed...")
+
+        if not within_budget(1):
+            print(f"  … API budget reached ({API_BUDGET_PER_HOUR}/hour), skipping refresh")
+            return None
+
+        groups = get_subscriptions()
+        if not groups:
+            print("No groups found")
+            return None
+
+        feed_cache['subscriptions_synced'] = time.time()
+        refreshed = 0
+        for group in sync_groups(groups):
+            entry = group_schedule[group['group_id']]
+            if not within_budget(entry['cost']):
+                # Left due, so the scheduler refreshes it once the budget allows
+                print(f"  … API budget reached ({API_BUDGET_PER_HOUR}/hour), deferring {group['group_name']}")
+                continue
+            refresh_group(group)
+            refreshed += 1
+
+        if not refreshed:
+            # Keep serving the current feed rather than one built from nothing
+            return None
+        return rebuild_feed()
+    finally:
+        refresh_lock.release()
+
+
+def run_scheduled_refreshes():
+    """Refresh the groups that are due, as far as the API budget allows"""
+    if not refresh_lock.acquire(blocking=False):
+        return  # A full refresh is running; the next tick picks up what is still due
+    try:
+        now = time.time()
+
+        if now - feed_cache['subscriptions_synced'] >= REFRESH_INTERVAL and within_budget(1):
+            groups = get_subscriptions()
+            if groups:
+                feed_cache['subscriptions_synced'] = now
+                sync_groups(groups)
+
+        due = sorted(
+            (entry for entry in group_schedule.values() if entry['next_refresh'] <= now),
+            key=lambda entry: entry['next_refresh'],
+        )
+        if not due:
+            return
+
+        print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Refreshing {len(due)} due groups...")
+        changed = False
+        for entry in due:
+            if not within_budget(entry['cost']):
+                # Most overdue groups go first next time
+                print(f"  … API budget reached ({API_BUDGET_PER_HOUR}/hour), deferring {entry['group']['group_name']}")
+                break
+            changed = refresh_group(entry['group']) or changed
+
+        if changed:
+            rebuild_feed()
+    finally:
+        refresh_lock.release()
+
+
+def initial_refresh():
+    """First full refresh after startup, seeded from the topic store"""
+    try:
+        with refresh_lock:
+            load_topics_from_store()
         generate_feed()
+    except Exception as e:
+        print(f"Initial refresh failed: {e}")
+
+
+async def refresh_scheduler():
+    """Background task that refreshes each group on its own adaptive schedule"""
+    await asyncio.to_thread(initial_refresh)
+    while True:
+        await asyncio.sleep(SCHEDULER_TICK)
+        try:
+            await asyncio.to_thread(run_scheduled_refreshes)
+        except Exception as e:
+            print(f"Scheduled refresh failed: {e}")
+
+
+def filter_key(spec):
+    """Canonical (groups, hashtags, authors) form of a subscription filter.
+
+    Tokens with the same filter share one cached view.
+    """
+    def normalize(values, strip=''):
+        return tuple(sorted({str(v).strip().lstrip(strip).lower() for v in values or []} - {''}))
+
+    return (
+        normalize(spec.get('groups')),
+        normalize(spec.get('hashtags'), strip='#'),
+        normalize(spec.get('authors')),
+    )
+
+
+def load_feed_tokens():
+    """Return the token map, re-reading FEED_TOKENS_FILE only when it changes"""
+    try:
+        mtime = os.stat(FEED_TOKENS_FILE).st_mtime
+    except OSError:
+        mtime = None
+
+    if mtime != feed_tokens['mtime']:
+        by_hash = {}
+        if mtime is not None:
+            try:
+                with open(FEED_TOKENS_FILE, 'r') as f:
+                    tokens = json.load(f)
+                for token, spec in tokens.items():
+                    by_hash[hashlib.sha256(token.encode('utf-8')).digest()] = filter_key(spec)
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"  ✗ Could not load {FEED_TOKENS_FILE}: {e}")
+                return feed_tokens['by_hash']
+
+        feed_tokens['by_hash'] = by_hash
+        feed_tokens['mtime'] = mtime
+        filtered_views.clear()
+
+    return feed_tokens['by_hash']
+
+
+def topic_matches(topic, key):
+    """Whether a topic passes a filter: any listed value per field, all fields"""
+    groups, hashtags, authors = key
+
+    if groups:
+        group_name = topic.get('group_name', '')
+        names = {
+            group_name.lower(),
+            group_name.split('+')[-1].lower(),
+            topic.get('nice_group_name', '').lower(),
+            str(group_alias_cache.get(topic.get('group_id_for_url'), '')).lower(),
+        }
+        if names.isdisjoint(groups):
+            return False
+
+    if authors and topic.get('name', '').lower() not in authors:
+        return False
+
+    if hashtags:
+        tags = {t.lower() for t in re.findall(r'#(\w+)', topic.get('subject', ''))}
+        for tag in topic.get('hashtags') or []:
+            tags.add((tag.get('name', '') if isinstance(tag, dict) else str(tag)).lstrip('#').lower())
+        if tags.isdisjoint(hashtags):
+            return False
+
+    return True
+
+
+def describe_filter(key):
+    """Human-readable feed title suffix for a filter"""
+    groups, hashtags, authors = key
+    parts = list(groups) + [f"#{tag}" for tag in hashtags] + list(authors)
+    return ", ".join(parts) if parts else "All topics"
+
+
+def recent_archive_topics(generation):
+    """Metadata (no bodies) of the newest archived topics, scanned once per generation"""
+    with view_lock:
+        if recent_archive['generation'] != generation:
+            recent_archive['topics'] = [
+                meta for meta in (topic_store.get(topic_id, with_body=False)
+                                  for topic_id in topic_store.recent_ids(FILTER_SCAN_LIMIT))
+                if meta
+            ]
+            recent_archive['generation'] = generation
+        return recent_archive['topics']
+
+
+def filtered_view(key):
+    """Encoded feed for a filter, rebuilt at most once per feed generation"""
+    generation = feed_cache['generation']
+    view = filtered_views.get(key)
+    if view and view['generation'] == generation:
+        return view
+
+    # One lock per filter, so a token only waits for its own view
+    with view_lock:
+        key_lock = view_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        view = filtered_views.get(key)
+        if view and view['generation'] == generation:
+            return view
+
+        # Match on metadata only; decode bodies just for the topics we keep
+        topics = []
+        for meta in recent_archive_topics(generation):
+            if topic_matches(meta, key):
+                topics.append(topic_store.get(meta['id']))
+                if len(topics) >= FILTERED_FEED_SIZE:
+                    break
+
+        # Views are shared between tokens, so the token never appears in the XML
+        xml = create_rss_feed(topics, title=f"{FEED_TITLE} - {describe_filter(key)}", self_url=None, hub_url=None)
+        view = dict(encode_feed(xml), generation=generation)
+        filtered_views[key] = view
+        return view
+
+
+def find_topics(q, limit):
+    """Run a search and load the matching topics from the topic store"""
+    topics = []
+    for match in search_index.search(q, max(1, min(limit, SEARCH_MAX_RESULTS))):
+        topic = topic_store.get(match['id'])
+        if topic:
+            topic.update(match)
+            topics.append(topic)
+    return topics
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    # Startup: Generate initial feed
+    # Startup: serve the last snapshot right away, refresh in the background
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+
     print("=" * 60)
     print("Groups.io RSS Feed Server (FastAPI)")
     print("=" * 60)
-    generate_feed()
-
-    # Start background refresh task
-    task = asyncio.create_task(refresh_feed_periodically())
-    print(f"\n✓ Auto-refresh enabled (every {REFRESH_INTERVAL // 60} minutes)")
+    load_websub_subscribers()
+    threading.Thread(target=websub_delivery_worker, name="websub-delivery", daemon=True).start()
+    if not SERVER_URL:
+        print("SERVER_URL not set: feed has no self/hub links, and the WebSub hub and media proxy are disabled")
+    if load_snapshot():
+        print(f"✓ Serving feed snapshot from {feed_cache['last_updated'].strftime('%Y-%m-%d %H:%M:%S')}")
+    else:
+        print("No feed snapshot yet; /feed.xml will be available after the first refresh")
+
+    # Start background refresh task (its first pass is a full refresh)
+    task = asyncio.create_task(refresh_scheduler())
+    print(f"\n✓ Adaptive refresh enabled (every {MIN_REFRESH_INTERVAL // 60}-{MAX_REFRESH_INTERVAL // 60} "
+          f"minutes per group, max {API_BUDGET_PER_HOUR} API calls/hour)")
 
     yield
 
     # Shutdown
     task.cancel()
+    save_snapshot()
 
 
 # Create FastAPI app
@@ -317,8 +1273,16 @@ app = FastAPI(
 )
 
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
+def cached_page(name, key, render):
+    """Encoded HTML of a page, re-rendered only when its key changes"""
+    cached = page_cache.get(name)
+    if cached is None or cached[0] != key:
+        cached = (key, render().encode('utf-8'))
+        page_cache[name] = cached
+    return cached[1]
+
+
+def render_homepage():
     """Homepage with instructions"""
     last_update = feed_cache['last_updated']
     last_update_str = last_update.strftime('%Y-%m-%d %H:%M:%S') if last_update else "Never"
@@ -403,7 +1367,14 @@ async def root():
         <h2>Endpoints</h2>
         <ul>
             <li><code>/feed.xml</code> - RSS feed</li>
+            <li><code>/feed/&lt;token&gt;.xml</code> - Personal filtered feed (see <code>FEED_TOKENS_FILE</code>)</li>
             <li><code>/refresh</code> - Force refresh the feed</li>
+            <li><code>/search?q=...</code> - Search all fetched topics (JSON)</li>
+            <li><code>/search.xml?q=...</code> - Search results as an RSS feed</li>
+            <li><code>/changes?since=&lt;cursor&gt;</code> - Feed changes since a cursor (JSON)</li>
+            <li><code>/events</code> - Live updates (Server-Sent Events)</li>
+            <li><code>/media/&lt;id&gt;</code> - Cached attachments and images from feed items</li>
+            <li><code>/websub</code> - WebSub hub for instant feed updates</li>
             <li><code>/status</code> - Server status</li>
             <li><code>/docs</code> - API documentation</li>
         </ul>
@@ -422,21 +1393,69 @@ async def root():
     return html
 
 
+def read_reader_page():
+    with open('feed_reader.html', 'r') as f:
+        return f.read()
+
+
+@app.get("/", response_class=HTMLResponse)
+async def root():
+    """Homepage with instructions"""
+    # Only the last-updated time changes between requests
+    return HTMLResponse(cached_page("home", feed_cache['last_updated'], render_homepage))
+
+
+def feed_response(request, body, gzipped, etag, extra_headers=None):
+    """Serve a cached feed with conditional GET and gzip support"""
+    if body is None:
+        return Response(
+            content="Feed is being generated, try again shortly",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "30"},
+        )
+
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache", **(extra_headers or {})}
+
+    if_none_match = request.headers.get('if-none-match', '')
+    if if_none_match.strip() == '*' or etag in [t.strip().removeprefix('W/') for t in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        headers["Content-Encoding"] = "gzip"
+        body = gzipped
+
+    return Response(content=body, media_type="application/rss+xml", headers=headers)
+
+
 @app.get("/feed.xml")
-async def get_feed(authorized: bool = Depends(verify_credentials)):
+async def get_feed(request: Request, authorized: bool = Depends(verify_credentials)):
     """Get the RSS feed (password protected if configured)"""
-    xml = feed_cache.get('xml')
+    # The change cursor this body reflects, for syncing with /changes and /events
+    cursor = feed_cache['body_cursor']
+    return feed_response(request, feed_cache['body'], feed_cache['gzip'], feed_cache['etag'],
+                         {"X-Feed-Cursor": str(cursor)})
 
-    if not xml:
-        # Generate if not cached
-        xml = generate_feed()
 
-    return Response(content=xml, media_type="application/rss+xml")
+@app.get("/feed/{token}.xml")
+def get_token_feed(token: str, request: Request):
+    """Per-user filtered feed; the token in the URL is the credential"""
+    key = load_feed_tokens().get(hashlib.sha256(token.encode('utf-8')).digest())
+    if key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown feed")
+
+    view = filtered_view(key)
+    return feed_response(request, view['body'], view['gzip'], view['etag'])
 
 
 @app.get("/refresh")
 async def refresh_feed(background_tasks: BackgroundTasks, authorized: bool = Depends(verify_credentials)):
     """Manually refresh the feed (password protected if configured)"""
+    if refresh_lock.locked():
+        # Coalesce: the running refresh already fetches the latest topics
+        return {
+            "status": "refreshing",
+            "message": "A refresh is already running"
+        }
     background_tasks.add_task(generate_feed)
     return {
         "status": "refreshing",
@@ -444,6 +1463,180 @@ async def refresh_feed(background_tasks: BackgroundTasks, authorized: bool = Dep
     }
 
 
+@app.get("/search")
+def search_topics(q: str, limit: int = 20, authorized: bool = Depends(verify_credentials)):
+    """Search every topic fetched so far (password protected if configured)"""
+    started = time.perf_counter()
+    topics = find_topics(q, limit)
+
+    return {
+        "query": q,
+        "count": len(topics),
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        "results": [
+            {
+                "id": topic['id'],
+                "title": f"[{topic['group_name']}] {topic['subject']}",
+                "link": topic_link(topic),
+                "author": topic.get('name', 'Unknown'),
+                "group": topic.get('nice_group_name', topic['group_name']),
+                "updated": topic.get('updated') or topic.get('created'),
+                "num_messages": topic.get('num_messages', 0),
+                "snippet": topic['snippet'],
+                "score": round(topic['score'], 3),
+            }
+            for topic in topics
+        ],
+    }
+
+
+@app.get("/search.xml")
+def search_feed(q: str, limit: int = 20, authorized: bool = Depends(verify_credentials)):
+    """Search results as an RSS feed (password protected if configured)"""
+    topics = find_topics(q, limit)
+    xml = create_rss_feed(
+        topics,
+        title=f"{FEED_TITLE} - Search: {q}",
+        self_url=f"{SERVER_URL}/search.xml?{urlencode({'q': q})}" if SERVER_URL else None,
+        hub_url=None,
+    )
+    return Response(content=xml, media_type="application/rss+xml")
+
+
+@app.get("/media/{media_id}")
+def get_media(media_id: str, request: Request, thumb: bool = False):
+    """Attachment or image from a feed item, fetched once and served from the disk cache.
+
+    Like token feeds, the unguessable id is the credential, so images load in
+    readers that don't send Basic Auth for them. Supports Range requests.
+    """
+    url = media_cache.source(media_id)
+    if url is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown media")
+
+    headers = {"Authorization": f"Bearer {API_KEY}"} if needs_media_proxy(url) else None
+    try:
+        path, content_type = media_cache.fetch(media_id, get_http_session(), headers)
+    except MediaTooLarge:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Media too large to proxy")
+    except Exception as e:
+        print(f"Media Error: {e}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Could not fetch media")
+
+    if thumb:
+        path, content_type = media_cache.thumbnail(media_id, path, content_type)
+
+    # Cached files never change for a given id
+    etag = f'"{media_id}{"-thumb" if thumb else ""}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=604800, immutable"}
+    if etag in [t.strip().removeprefix('W/') for t in request.headers.get('if-none-match', '').split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    size = os.path.getsize(path)
+    try:
+        byte_range = parse_range(request.headers.get('range'), size)
+    except ValueError:
+        return Response(
+            status_code=416,  # Range Not Satisfiable
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, status.HTTP_200_OK
+    else:
+        (start, end), status_code = byte_range, status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(iter_file(path, start, end), status_code=status_code,
+                             media_type=content_type, headers=headers)
+
+
+@app.get("/changes")
+def get_changes(since: int, authorized: bool = Depends(verify_credentials)):
+    """Changes after a cursor as a compact delta (password protected if configured)"""
+    return changes_since(since)
+
+
+def format_event(delta):
+    """SSE message for a delta; its id is the cursor, so reconnects resume from it"""
+    event_type = "reset" if delta['reset'] else "changes"
+    return f"id: {delta['cursor']}\nevent: {event_type}\ndata: {json.dumps(delta)}\n\n"
+
+
+@app.get("/events")
+async def feed_events(request: Request, since: int = None, authorized: bool = Depends(verify_credentials)):
+    """Stream feed changes as Server-Sent Events (password protected if configured)"""
+    queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    event_subscribers.add(queue)
+
+    # Replay what the client missed: after a reconnect EventSource sends the last
+    # cursor it saw, and a first connection can pass the cursor it loaded as ?since=
+    last_event_id = request.headers.get('last-event-id', '')
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    catch_up = changes_since(since) if since is not None else None
+
+    async def stream():
+        try:
+            yield "retry: 10000\n\n"
+            if catch_up is not None and (catch_up['reset'] or catch_up['changes']):
+                yield format_event(catch_up)
+            # End the stream now and then so open streams don't hold up a
+            # shutdown or restart; EventSource resumes from Last-Event-ID
+            deadline = event_loop.time() + EVENT_STREAM_MAX_AGE
+            while not await request.is_disconnected():
+                if queue not in event_subscribers:
+                    # Dropped for falling behind
+                    break
+                remaining = deadline - event_loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=min(EVENT_KEEPALIVE, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            event_subscribers.discard(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/websub")
+async def websub_hub(request: Request, background_tasks: BackgroundTasks,
+                     authorized: bool = Depends(verify_credentials)):
+    """WebSub hub for this server's feed (password protected if configured)"""
+    if HUB_URL is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="WebSub hub disabled: SERVER_URL is not set")
+    form = parse_qs((await request.body()).decode('utf-8'))
+    mode = form.get('hub.mode', [''])[0]
+    topic = form.get('hub.topic', [''])[0]
+    callback = form.get('hub.callback', [''])[0]
+    secret = form.get('hub.secret', [''])[0]
+
+    if mode not in ("subscribe", "unsubscribe"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported hub.mode")
+    if urlparse(topic).path != "/feed.xml":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown hub.topic")
+    if urlparse(callback).scheme not in ("http", "https"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid hub.callback")
+
+    try:
+        lease_seconds = int(form.get('hub.lease_seconds', [WEBSUB_DEFAULT_LEASE])[0])
+    except ValueError:
+        lease_seconds = WEBSUB_DEFAULT_LEASE
+    lease_seconds = max(60, min(lease_seconds, WEBSUB_MAX_LEASE))
+
+    background_tasks.add_task(verify_websub_intent, mode, callback, lease_seconds, secret)
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
 @app.get("/status")
 async def get_status():
     """Get server status"""
@@ -452,16 +1645,34 @@ async def get_status():
     return {
         "status": "running",
         "last_updated": last_update.isoformat() if last_update else None,
-        "feed_cached": feed_cache.get('xml') is not None,
-        "refresh_interval_minutes": REFRESH_INTERVAL // 60
+        "feed_cached": feed_cache['body'] is not None,
+        "refresh_interval_minutes": REFRESH_INTERVAL // 60,
+        "api_calls_last_hour": api_calls_last_hour(),
+        "api_budget_per_hour": API_BUDGET_PER_HOUR,
+        "groups": {
+            entry['group']['group_name']: {
+                "posts_per_hour": round(entry['rate'], 2),
+                "refresh_interval_minutes": entry['interval'] // 60,
+                "next_refresh": datetime.fromtimestamp(entry['next_refresh']).isoformat(),
+            }
+            # Snapshot: the refresh thread adds and removes groups concurrently
+            for entry in list(group_schedule.values())
+        },
+        "websub_subscribers": len(websub_subscribers),
+        "event_clients": len(event_subscribers),
+        "change_cursor": feed_cache['cursor'],
+        "archived_topics": len(topic_store),
+        "feed_tokens": len(feed_tokens['by_hash']),
+        "filtered_views": len(filtered_views),
+        "media_items": len(media_cache),
+        "search_index_topics": search_index.count()
     }
 
 
 @app.get("/reader", response_class=HTMLResponse)
 async def feed_reader(authorized: bool = Depends(verify_credentials)):
     """Web-based feed reader (password protected if configured)"""
-    with open('feed_reader.html', 'r') as f:
-        return f.read()
+    return HTMLResponse(cached_page("reader", None, read_reader_page))
 
 
 if __name__ == "__main__":
@@ -477,4 +1688,5 @@ if __name__ == "__main__":
     print("\nPress Ctrl+C to stop")
     print("=" * 60 + "\n")
 
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    # Don't let open /events streams block a restart; lifespan shutdown still saves the snapshot
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info", timeout_graceful_shutdown=SHUTDOWN_GRACE)
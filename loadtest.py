@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Load Test for fastapi_rss_server
+
+Starts a fake groups.io API and the server (uvicorn, in a temporary
+directory) pointed at it, then runs concurrent readers against the serving
+endpoints and reports requests/s and p50/p99/p999 latency per endpoint.
+
+Scenarios:
+    steady       Clients poll /feed.xml, /reader, / and /status with gzip,
+                 while a refresh is triggered every few seconds
+    herd         Thundering herd: /refresh, then every client fetches
+                 /feed.xml at the same moment, for several rounds
+    conditional  Clients re-poll /feed.xml with If-None-Match (mostly 304s),
+                 with periodic refreshes changing the ETag
+
+Exits with status 1 if any endpoint breaks the latency or error-rate SLOs.
+
+Usage:
+    python3 loadtest.py [--scenarios steady,herd,conditional] [--clients 50]
+                        [--duration 10] [--slo-p99-ms 250] [--slo-p999-ms 1000]
+
+Options:
+    --scenarios       Comma-separated scenarios to run (default: all)
+    --clients         Concurrent clients (default: 50)
+    --duration        Seconds per steady/conditional scenario (default: 10)
+    --interval        Seconds each client waits between polls (default: 0.1)
+    --refresh-every   Seconds between /refresh calls during a scenario (default: 5)
+    --herd-rounds     Rounds in the herd scenario (default: 5)
+    --groups          Groups served by the fake API (default: 8)
+    --topics          Topics per group (default: 25)
+    --api-latency     Seconds the fake API takes per call (default: 0.02)
+    --slo-p99-ms      Max p99 latency per endpoint (default: 250)
+    --slo-p999-ms     Max p999 latency per endpoint (default: 1000)
+    --max-error-rate  Max share of failed requests per endpoint (default: 0.001)
+    --json            Also write the results to this file
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ("steady", "herd", "conditional")
+
+# Request mix for the steady scenario: (path, weight)
+STEADY_MIX = (("/feed.xml", 70), ("/reader", 10), ("/", 10), ("/status", 10))
+
+
+class FakeGroupsIO:
+    """Just enough of the groups.io API for the server to build a feed.
+
+    Every getsubs call (one per full refresh) advances the topic list by one,
+    so each refresh has a new topic and the feed actually changes.
+    """
+
+    def __init__(self, groups, topics_per_group, latency):
+        self.groups = groups
+        self.topics_per_group = topics_per_group
+        self.latency = latency
+        self.generation = 0
+        self.calls = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.port = self.server.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    def respond(self, endpoint, params):
+        self.calls += 1
+        time.sleep(self.latency)
+
+        if endpoint == "getsubs":
+            self.generation += 1
+            return {"data": [
+                {"group_id": g, "group_name": f"parkslopeparents+Group{g}", "nice_group_name": f"Group {g}",
+                 "perms": {"archives_visible": True}}
+                for g in range(1, self.groups + 1)
+            ]}
+        if endpoint == "getgroup":
+            return {"group_url": f"https://groups.parkslopeparents.com/g/Group{params['group_id']}"}
+        if endpoint == "gettopics":
+            group_id = int(params["group_id"])
+            newest = self.generation + self.topics_per_group
+            return {"data": [
+                {"id": group_id * 100000 + n, "subject": f"Load test topic {n}", "name": f"Member {n % 17}",
+                 "summary": "Looking for recommendations for a pediatrician in the neighborhood " * 3,
+                 "num_messages": 1 + n % 5, "has_attachments": False,
+                 "created": self.timestamp(n), "updated": self.timestamp(n)}
+                for n in range(newest, newest - int(params.get("limit", 10)), -1)
+            ]}
+        if endpoint == "gettopic":
+            return {"data": [{"body": "<p>" + "Message body text for the load test. " * 60 + "</p>"}]}
+        return {}
+
+    @staticmethod
+    def timestamp(n):
+        return time.strftime("%Y-%m-%dT%H:%M:%S-05:00", time.localtime(1_767_225_600 + n * 600))
+
+    def handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = json.dumps(api.respond(url.path.rsplit('/', 1)[-1], params)).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class Results:
+    """Latencies and failures per endpoint for one scenario"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def record(self, path, seconds, status):
+        with self.lock:
+            self.latencies.setdefault(path, []).append(seconds)
+            self.statuses.setdefault(path, {}).setdefault(status, 0)
+            self.statuses[path][status] += 1
+            if status is None or status >= 500:
+                self.errors[path] = self.errors.get(path, 0) + 1
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def summary(self):
+        rows = {}
+        for path, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            rows[path] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(path, 0),
+                "rps": len(latencies) / self.elapsed,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "p999_ms": percentile(latencies, 0.999) * 1000,
+                "statuses": {str(k): v for k, v in self.statuses[path].items()},
+            }
+        return rows
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+class Client:
+    """One keep-alive connection to the server, reconnecting after errors"""
+
+    def __init__(self, port, results):
+        self.port = port
+        self.results = results
+        self.conn = None
+
+    def get(self, path, headers=None):
+        """GET a path and record its latency; returns the response or None"""
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+            self.conn.request("GET", path, headers=headers or {})
+            response = self.conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            self.results.record(path, time.perf_counter() - started, None)
+            return None
+        self.results.record(path, time.perf_counter() - started, response.status)
+        return response
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def run_clients(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def periodic_refresh(port, every, stop):
+    """Trigger /refresh every few seconds until stopped (not measured)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while not stop.wait(every):
+        conn.request("GET", "/refresh")
+        conn.getresponse().read()
+    conn.close()
+
+
+def scenario_steady(port, args):
+    results = Results()
+    stop = threading.Event()
+    paths = [path for path, _ in STEADY_MIX]
+    weights = [weight for _, weight in STEADY_MIX]
+    deadline = time.perf_counter() + args.duration
+
+    def client(i):
+        c = Client(port, results)
+        while time.perf_counter() < deadline:
+            c.get(random.choices(paths, weights)[0], {"Accept-Encoding": "gzip"})
+            time.sleep(args.interval * random.uniform(0.5, 1.5))
+        c.close()
+
+    refresher = threading.Thread(target=periodic_refresh, args=(port, args.refresh_every, stop))
+    refresher.start()
+    run_clients(args.clients, client)
+    stop.set()
+    refresher.join()
+    results.finish()
+    return results
+
+
+def scenario_herd(port, args):
+    results = Results()
+    barrier = threading.Barrier(args.clients + 1)
+
+    def client(i):
+        c = Client(port, results)
+        for _ in range(args.herd_rounds):
+            barrier.wait()
+            c.get("/feed.xml", {"Accept-Encoding": "gzip"})
+            barrier.wait()
+        c.close()
+
+    def coordinator():
+        trigger = Client(port, Results())  # /refresh itself isn't measured
+        for _ in range(args.herd_rounds):
+            trigger.get("/refresh")
+            time.sleep(0.05)  # Let the refresh get going
+            barrier.wait()  # Release the herd
+            barrier.wait()  # Wait for everyone to be served
+            time.sleep(1)
+        trigger.close()
+
+    thread = threading.Thread(target=coordinator)
+    thread.start()
+    run_clients(args.clients, client)
+    thread.join()
+    results.finish()
+    return results
+
+
+def scenario_conditional(port, args):
+    results = Results()
+    stop = threading.Event()
+    deadline = time.perf_counter() + args.duration
+
+    def client(i):
+        c = Client(port, results)
+        etag = None
+        while time.perf_counter() < deadline:
+            headers = {"Accept-Encoding": "gzip"}
+            if etag:
+                headers["If-None-Match"] = etag
+            response = c.get("/feed.xml", headers)
+            if response is not None and response.status == 200:
+                etag = response.getheader("ETag")
+            time.sleep(args.interval * random.uniform(0.5, 1.5))
+        c.close()
+
+    refresher = threading.Thread(target=periodic_refresh, args=(port, args.refresh_every, stop))
+    refresher.start()
+    run_clients(args.clients, client)
+    stop.set()
+    refresher.join()
+    results.finish()
+    return results
+
+
+def start_server(workdir, port, api):
+    env = dict(os.environ)
+    env.update({
+        "GROUPS_IO_API_KEY": "loadtest",
+        "GROUPS_IO_BASE_URL": api.base_url,
+        "TOPICS_PER_GROUP": str(api.topics_per_group),
+        "PYTHONPATH": REPO_DIR,
+        "FEED_USERNAME": "",
+        "FEED_PASSWORD": "",
+    })
+    # /reader serves feed_reader.html from the working directory
+    os.symlink(os.path.join(REPO_DIR, "feed_reader.html"), os.path.join(workdir, "feed_reader.html"))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fastapi_rss_server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for_feed(port, timeout=60):
+    """Wait until the first refresh has produced a feed"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/feed.xml")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"/feed.xml not available after {timeout}s")
+
+
+def check_slos(name, rows, args):
+    """Return a list of SLO breaches for one scenario"""
+    breaches = []
+    for path, row in rows.items():
+        if row["p99_ms"] > args.slo_p99_ms:
+            breaches.append(f"{name} {path}: p99 {row['p99_ms']:.1f} ms > {args.slo_p99_ms:.0f} ms")
+        if row["p999_ms"] > args.slo_p999_ms:
+            breaches.append(f"{name} {path}: p999 {row['p999_ms']:.1f} ms > {args.slo_p999_ms:.0f} ms")
+        error_rate = row["errors"] / row["requests"]
+        if error_rate > args.max_error_rate:
+            breaches.append(f"{name} {path}: error rate {error_rate:.2%} > {args.max_error_rate:.2%}")
+    return breaches
+
+
+def print_results(name, rows):
+    print(f"\n{name}")
+    print(f"  {'endpoint':<12} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'p999 ms':>8}  statuses")
+    for path, row in rows.items():
+        statuses = ", ".join(f"{k}×{v}" for k, v in sorted(row["statuses"].items()))
+        print(f"  {path:<12} {row['requests']:>9,} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['p999_ms']:>8.1f}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test fastapi_rss_server against a fake groups.io")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per steady/conditional scenario")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds each client waits between polls")
+    parser.add_argument("--refresh-every", type=float, default=5.0, help="Seconds between /refresh calls")
+    parser.add_argument("--herd-rounds", type=int, default=5, help="Rounds in the herd scenario")
+    parser.add_argument("--groups", type=int, default=8, help="Groups served by the fake API")
+    parser.add_argument("--topics", type=int, default=25, help="Topics per group")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="Seconds the fake API takes per call")
+    parser.add_argument("--port", type=int, default=8124, help="Port for the server under test")
+    parser.add_argument("--slo-p99-ms", type=float, default=250.0, help="Max p99 latency per endpoint")
+    parser.add_argument("--slo-p999-ms", type=float, default=1000.0, help="Max p999 latency per endpoint")
+    parser.add_argument("--max-error-rate", type=float, default=0.001, help="Max share of failed requests")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    print("=" * 60)
+    print("fastapi_rss_server Load Test")
+    print("=" * 60)
+
+    runners = {"steady": scenario_steady, "herd": scenario_herd, "conditional": scenario_conditional}
+    api = FakeGroupsIO(args.groups, args.topics, args.api_latency)
+    api.start()
+    report = {}
+    breaches = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_server(workdir, args.port, api)
+        try:
+            wait_for_feed(args.port)
+            print(f"Server ready: {args.groups} groups × {args.topics} topics, {args.clients} clients")
+
+            for name in scenarios:
+                results = runners[name](args.port, args)
+                rows = results.summary()
+                print_results(name, rows)
+                report[name] = rows
+                breaches.extend(check_slos(name, rows, args))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+            api.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print()
+    if breaches:
+        for breach in breaches:
+            print(f"✗ {breach}")
+        sys.exit(1)
+    print(f"✓ All endpoints within SLOs (p99 ≤ {args.slo_p99_ms:.0f} ms, p999 ≤ {args.slo_p999_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
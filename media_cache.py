@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+On-Disk Media Cache for Attachments and Images
+
+Downloads attachments and inline images once, streaming them to disk, and
+serves them from there. The cache is bounded: files are touched on every
+read and the least recently used ones are evicted when the cache grows past
+its size limit. Thumbnails are generated with Pillow (a requirement, but
+imported lazily); if it is missing, thumbnail requests fall back to the
+original image.
+
+The cache keeps an index (media id -> source URL and content type) in
+index.json, so ids handed out in feeds keep working after a restart. Ids
+whose file isn't cached and that haven't been registered for INDEX_TTL are
+dropped from the index, so it doesn't grow forever; callers re-register the
+ids they still link to.
+
+Usage:
+    from media_cache import MediaCache
+
+    cache = MediaCache("media_cache", max_bytes=500 * 1024 * 1024)
+    cache.register(media_id, url)
+    path, content_type = cache.fetch(media_id, session, headers)
+"""
+
+import json
+import os
+import threading
+import time
+
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+INDEX_TTL = 30 * 24 * 3600  # Uncached ids not registered for this long are forgotten
+SEEN_RESOLUTION = 3600  # Re-registering an id updates its "seen" time at most this often
+
+
+class MediaTooLarge(Exception):
+    """Raised when a download exceeds the per-file size limit"""
+
+
+class MediaCache:
+    """Bounded LRU cache of downloaded media files"""
+
+    def __init__(self, cache_dir, max_bytes, max_file_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+        self.download_locks = {}  # One lock per media id, so each file is fetched once
+        self.index_dirty = False
+
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        for entry in self.index.values():
+            entry.setdefault("seen", int(time.time()))
+
+    def __len__(self):
+        return len(self.index)
+
+    def register(self, media_id, url, content_type=None):
+        """Remember where a media id comes from, and that it is still linked to"""
+        now = int(time.time())
+        with self.lock:
+            entry = self.index.get(media_id)
+            if entry is None:
+                self.index[media_id] = {"url": url, "type": content_type, "seen": now}
+                self.index_dirty = True
+            elif now - entry.get("seen", 0) >= SEEN_RESOLUTION:
+                entry["seen"] = now
+                self.index_dirty = True
+
+    def source(self, media_id):
+        """Source URL of a registered media id, or None"""
+        entry = self.index.get(media_id)
+        return entry["url"] if entry else None
+
+    def save_index(self):
+        with self.lock:
+            if not self.index_dirty:
+                return
+            self.index_dirty = False
+            data = json.dumps(self.index)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, self.index_path)
+
+    def path(self, media_id, thumbnail=False):
+        return os.path.join(self.cache_dir, f"{media_id}.thumb" if thumbnail else media_id)
+
+    def fetch(self, media_id, session, headers=None):
+        """Return (path, content_type), downloading the file on first use.
+
+        Raises KeyError for unknown ids, and MediaTooLarge without downloading
+        again for files that already turned out to be over the size limit.
+        """
+        entry = self.index[media_id]
+        path = self.path(media_id)
+
+        with self._lock_for(media_id):
+            if entry.get("too_large"):
+                raise MediaTooLarge(entry["url"])
+            if not os.path.exists(path):
+                self._download(entry, path, session, headers)
+                self.evict()  # Also saves the index
+
+        self.touch(path)
+        return path, entry.get("type") or "application/octet-stream"
+
+    def _lock_for(self, media_id):
+        with self.lock:
+            return self.download_locks.setdefault(media_id, threading.Lock())
+
+    def _download(self, entry, path, session, headers):
+        """Stream a URL to disk without holding it in memory"""
+        tmp_path = f"{path}.part"
+        with session.get(entry["url"], headers=headers, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            written = 0
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > self.max_file_bytes:
+                        f.close()
+                        os.remove(tmp_path)
+                        with self.lock:
+                            entry["too_large"] = True
+                            self.index_dirty = True
+                        self.save_index()
+                        raise MediaTooLarge(entry["url"])
+                    f.write(chunk)
+
+        os.replace(tmp_path, path)
+        content_type = response.headers.get("Content-Type", "").split(';')[0].strip()
+        if content_type:
+            with self.lock:
+                entry["type"] = content_type
+                self.index_dirty = True
+
+    def thumbnail(self, media_id, source_path, content_type):
+        """Return (path, content_type) of a downscaled copy, or the original"""
+        try:
+            from PIL import Image  # Optional; imported here to keep startup fast
+        except ImportError:
+            return source_path, content_type
+        if not content_type.startswith("image/"):
+            return source_path, content_type
+
+        thumb_path = self.path(media_id, thumbnail=True)
+        with self._lock_for(media_id):
+            if not os.path.exists(thumb_path):
+                try:
+                    with Image.open(source_path) as image:
+                        image.thumbnail(THUMBNAIL_SIZE)
+                        tmp_path = f"{thumb_path}.part"
+                        image.convert("RGB").save(tmp_path, "JPEG", quality=80)
+                        os.replace(tmp_path, thumb_path)
+                except (OSError, ValueError, Image.DecompressionBombError):
+                    return source_path, content_type
+
+        self.touch(thumb_path)
+        return thumb_path, "image/jpeg"
+
+    def touch(self, path):
+        """Mark a file as recently used"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Delete least recently used files until the cache fits its limit,
+        then forget stale ids that have no cached file"""
+        with self.lock:
+            files = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if entry.name == "index.json" or entry.name.endswith((".part", ".tmp")):
+                    continue
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            # Leave some headroom so we don't evict on every download
+            target = self.max_bytes * 0.9 if total > self.max_bytes else total
+            cached = set()
+            for _, size, path in sorted(files):
+                if total <= target:
+                    cached.add(os.path.basename(path))
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    cached.add(os.path.basename(path))
+
+            cutoff = time.time() - INDEX_TTL
+            stale = [media_id for media_id, entry in self.index.items()
+                     if media_id not in cached and entry.get("seen", 0) < cutoff]
+            for media_id in stale:
+                del self.index[media_id]
+                self.download_locks.pop(media_id, None)
+            if stale:
+                self.index_dirty = True
+        self.save_index()
+
+
+def message_attachments(message):
+    """Normalize the attachments of a groups.io message to {url, filename, type, size}"""
+    attachments = []
+    for attachment in message.get("attachments") or []:
+        url = attachment.get("download_url") or attachment.get("url")
+        if not url:
+            continue
+        attachments.append({
+            "url": url,
+            "filename": attachment.get("filename") or attachment.get("name") or "",
+            "type": attachment.get("media_type") or attachment.get("content_type") or "application/octet-stream",
+            "size": attachment.get("size") or 0,
+        })
+    return attachments
+
+
+def parse_range(header, size):
+    """Parse a single 'bytes=' Range header into inclusive (start, end).
+
+    Returns None when there is no usable Range header (serve the whole file)
+    and raises ValueError when the range can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or ',' in header:
+        return None
+
+    start_text, _, end_text = header[len("bytes="):].strip().partition('-')
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, end
+
+
+def iter_file(path, start, end):
+    """Yield bytes start..end (inclusive) of a file in chunks"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -17,14 +17,17 @@ import http.server
 import socketserver
 import threading
 import time
+import os
 import sys
 from pathlib import Path
 
 # Import the feed generator
 import generate_rss_feed as rss_gen
+from topic_store import TopicStore
 
 PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
 REFRESH_INTERVAL = 1800  # Refresh every 30 minutes (1800 seconds)
+TOPIC_STORE_PATH = os.getenv("TOPIC_STORE_PATH", "topics")  # Shared with fastapi_rss_server.py
 
 
 class RSSRequestHandler(http.server.SimpleHTTPRequestHandler):
@@ -97,6 +100,26 @@ def generate_feed():
         print(f"Error generating feed: {e}")
 
 
+def write_feed_from_store():
+    """Write feed.xml from the local topic store, without any API calls.
+
+    Returns False if there is no store (or it is empty).
+    """
+    store = TopicStore(TOPIC_STORE_PATH)
+    if not len(store):
+        return False
+
+    all_topics = []
+    for group_id in store.group_ids():
+        for topic_id in store.recent_ids(rss_gen.TOPICS_PER_GROUP, group_id):
+            all_topics.append(store.get(topic_id))
+
+    all_topics.sort(key=lambda x: x.get('updated') or x.get('created'), reverse=True)
+    rss_xml = rss_gen.create_rss_feed(all_topics)
+    rss_gen.save_feed(rss_xml, rss_gen.OUTPUT_FILE)
+    return True
+
+
 def auto_refresh_feed():
     """Periodically refresh the feed in the background"""
     while True:
@@ -110,7 +133,12 @@ def main():
     print("Groups.io RSS Feed Server")
     print("=" * 60)
     print()
-    generate_feed()
+    if write_feed_from_store():
+        # Serve the archived topics right away and refresh from the API in the background
+        print(f"✓ Initial feed written from topic store ({TOPIC_STORE_PATH})")
+        threading.Thread(target=generate_feed, daemon=True).start()
+    else:
+        generate_feed()
 
     # Start background refresh thread
     refresh_thread = threading.Thread(target=auto_refresh_feed, daemon=True)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Full-text Search Index for Groups.io Topics
+
+Keeps a local SQLite FTS5 index of topic subjects, authors, groups and full
+message bodies, so searches are answered from disk without any groups.io
+API calls. Topics are added incrementally: a topic is only re-indexed when
+its version (last update, message count, body) changes. The index returns
+topic ids; the topics themselves live in the topic store (topic_store.py).
+
+To keep queries fast on very common words, bm25 ranking is applied to the
+most recent CANDIDATE_LIMIT matches plus the SUBJECT_CANDIDATES best subject
+matches from the whole archive, rather than to every match, so an old topic
+whose subject matches still comes up. Words in more than SUBJECT_PASS_DENSITY
+of topics (like "the") skip the subject pass: it would rank a large share of
+the archive, and bm25 gives such words almost no weight anyway.
+
+Usage:
+    from search_index import SearchIndex
+
+    index = SearchIndex("search_index.db")
+    index.add_topics(topics)
+    results = index.search("stroller")  # [{"id", "snippet", "score"}, ...]
+"""
+
+import html
+import json
+import re
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed (
+    id INTEGER PRIMARY KEY,
+    version TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS topics_fts USING fts5(
+    subject, name, group_name, body,
+    tokenize = 'porter unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+
+# bm25 column weights: subject, name, group_name, body
+RANK = "bm25(topics_fts, 10.0, 4.0, 1.0, 1.0)"
+CANDIDATE_LIMIT = 1000  # Newest matches considered for ranking
+SUBJECT_CANDIDATES = 100  # Best subject matches of any age considered for ranking
+SUBJECT_PASS_DENSITY = 0.1  # Skip the subject pass for queries matching more of the newest topics
+SNIPPET_WORDS = 24
+
+
+def html_to_text(html_string):
+    """Strip tags and decode entities for indexing"""
+    text = re.sub(r'<(script|style)[^>]*>.*?</\1>', ' ', html_string or '', flags=re.S | re.I)
+    text = re.sub(r'<[^>]+>', ' ', text)
+    return re.sub(r'\s+', ' ', html.unescape(text)).strip()
+
+
+def query_words(query):
+    """Split free text into lowercase search words"""
+    return re.findall(r'\w+', query.lower())
+
+
+def build_match_query(words):
+    """Turn search words into a safe FTS5 query; the last word matches as a prefix.
+
+    A one-letter prefix has no prefix index and would scan a large part of the
+    term list, so it only matches as a whole word.
+    """
+    terms = [f'"{word}"' for word in words]
+    if len(words[-1]) >= 2:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def same_stem(token, word):
+    """Whether a text token and a search word likely share a porter stem.
+
+    True when they differ only by a short suffix ("strollers"/"stroller",
+    "babies"/"baby", "running"/"run"), or the token extends the word.
+    """
+    if token.startswith(word):
+        return True
+    shared = 0
+    for a, b in zip(token, word):
+        if a != b:
+            break
+        shared += 1
+    shorter, longer = sorted((len(token), len(word)))
+    return shared >= 3 and shorter - shared <= 1 and longer - shared <= 4
+
+
+def make_snippet(text, words):
+    """Return a short excerpt around the first matching word, matches in <b>"""
+    tokens = text.split()
+    heads = [word[:3] for word in words]  # Every match starts with one of these
+
+    def matches(token):
+        token = token.lower()
+        if not any(head in token for head in heads):
+            return False
+        token = re.sub(r'\W+', '', token)
+        return any(same_stem(token, word) for word in words)
+
+    first = next((i for i, token in enumerate(tokens) if matches(token)), 0)
+    start = max(0, first - SNIPPET_WORDS // 4)
+    excerpt = tokens[start:start + SNIPPET_WORDS]
+
+    marked = [f"<b>{html.escape(t)}</b>" if matches(t) else html.escape(t) for t in excerpt]
+    prefix = '… ' if start > 0 else ''
+    suffix = ' …' if start + SNIPPET_WORDS < len(tokens) else ''
+    return prefix + ' '.join(marked) + suffix
+
+
+def topic_index_version(topic):
+    """Identify the indexed revision of a topic"""
+    return json.dumps([
+        topic.get('updated') or topic.get('created'),
+        topic.get('num_messages', 0),
+        len(topic.get('full_body') or ''),
+    ])
+
+
+class SearchIndex:
+    """SQLite FTS5 index over cached topics, safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def add_topics(self, topics):
+        """Index new or changed topics; returns how many were (re)indexed"""
+        indexed = 0
+        with self.lock, self.conn:
+            for topic in topics:
+                version = topic_index_version(topic)
+                row = self.conn.execute("SELECT version FROM indexed WHERE id = ?", (topic['id'],)).fetchone()
+                if row and row[0] == version:
+                    continue
+
+                body = html_to_text(topic.get('full_body') or topic.get('summary', ''))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO indexed (id, version) VALUES (?, ?)",
+                    (topic['id'], version),
+                )
+                self.conn.execute("DELETE FROM topics_fts WHERE rowid = ?", (topic['id'],))
+                self.conn.execute(
+                    "INSERT INTO topics_fts (rowid, subject, name, group_name, body) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        topic['id'],
+                        topic.get('subject', ''),
+                        topic.get('name', ''),
+                        topic.get('nice_group_name') or topic.get('group_name', ''),
+                        body,
+                    ),
+                )
+                indexed += 1
+        return indexed
+
+    def search(self, query, limit=20):
+        """Return {"id", "snippet", "score"} for the best matches, best first"""
+        words = query_words(query)
+        if not words:
+            return []
+
+        match = build_match_query(words)
+        with self.lock:
+            scores = dict(self.conn.execute(
+                f"SELECT rowid, {RANK} FROM topics_fts WHERE topics_fts MATCH ? ORDER BY rowid DESC LIMIT ?",
+                (match, CANDIDATE_LIMIT),
+            ))
+
+            if len(scores) == CANDIDATE_LIMIT and self._match_density(min(scores)) <= SUBJECT_PASS_DENSITY:
+                # Older matches exist: also rank the best subject matches of any
+                # age. The column filter leaves body hits out of these scores,
+                # so they are a lower bound of the full score.
+                for topic_id, rank in self.conn.execute(
+                    f"SELECT rowid, {RANK} AS rank FROM topics_fts WHERE topics_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (f"subject : ({match})", SUBJECT_CANDIDATES),
+                ):
+                    scores.setdefault(topic_id, rank)
+
+            results = []
+            for topic_id, rank in sorted(scores.items(), key=lambda item: item[1])[:limit]:
+                body = self.conn.execute("SELECT body FROM topics_fts WHERE rowid = ?", (topic_id,)).fetchone()[0]
+                results.append({"id": topic_id, "snippet": make_snippet(body, words), "score": -rank})
+        return results
+
+    def _match_density(self, oldest_candidate):
+        """Share of the topics from the oldest candidate on that matched"""
+        newer = self.conn.execute("SELECT COUNT(*) FROM indexed WHERE id >= ?", (oldest_candidate,)).fetchone()[0]
+        return CANDIDATE_LIMIT / max(newer, 1)
+
+    def count(self):
+        """Number of indexed topics"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM indexed").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
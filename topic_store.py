@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Compact On-Disk Topic Store
+
+Stores topics as fixed-width binary records in `<path>.dat` (ids, group,
+timestamps, counts, flags and string references) with every variable-length
+string - subjects, names, summaries, bodies - in a separate `<path>.heap`.
+Both files are memory-mapped, so opening a store only maps the files and
+builds an id -> row index; strings are decoded only when a topic is read.
+
+Records are append-only: writing a newer version of a topic appends a new
+record and the index points at the latest one. Strings that didn't change
+between versions (usually the body) are shared, not written again. Writers
+take an exclusive file lock, write heap data before the record that
+references it, and readers ignore a trailing partial record, so a reader
+never sees a record whose strings are missing.
+
+Usage:
+    from topic_store import TopicStore
+
+    store = TopicStore("topics")                  # read-only, zero-copy
+    store = TopicStore("topics", writable=True)   # for refreshers/backfill
+    store.put_topics(topics)
+    topic = store.get(117238076)
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer use only
+    fcntl = None
+
+MAGIC = b'PSPTOPIC'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sII')  # magic, format version, record size
+
+# Variable-length fields kept in the heap, in record order
+STRING_FIELDS = (
+    'subject', 'name', 'summary', 'group_name', 'nice_group_name',
+    'full_body', 'created', 'updated', 'extra',
+)
+
+# id, group_id, created (epoch µs), updated (epoch µs), num_messages, flags,
+# then (heap offset, length) for each string field
+RECORD = struct.Struct('<qqqqiI' + 'QI' * len(STRING_FIELDS))
+
+# Column scans: unpack just the leading columns of every record, skipping the rest
+ID_COLUMN = struct.Struct(f'<q{RECORD.size - 8}x')
+SORT_COLUMNS = struct.Struct(f'<qqqq{RECORD.size - 32}x')  # id, group_id, created, updated
+
+# Boolean topic attributes packed into the flags column
+FLAGS = {
+    'has_attachments': 1,
+    'is_sticky': 2,
+    'is_moderated': 4,
+    'is_closed': 8,
+}
+
+# Fields with their own column; everything else goes into the 'extra' JSON
+COLUMN_FIELDS = {'id', 'group_id_for_url', 'num_messages'} | set(FLAGS) | set(STRING_FIELDS)
+
+# Fields shared by many topics (one value per group), stored once per writer
+INTERNED_FIELDS = ('group_name', 'nice_group_name')
+
+
+def to_micros(date_string):
+    """Convert an ISO 8601 timestamp to epoch microseconds (0 if missing)"""
+    if not date_string:
+        return 0
+    try:
+        if '.' in date_string:
+            # Trim fractional seconds to microseconds (groups.io sends nanoseconds)
+            head, tail = date_string.split('.', 1)
+            digits = len(tail) - len(tail.lstrip('0123456789'))
+            date_string = f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}"
+        parsed = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+        return int(parsed.timestamp() * 1_000_000)
+    except ValueError:
+        return 0
+
+
+class TopicStore:
+    """Memory-mapped fixed-width topic records plus a string heap"""
+
+    def __init__(self, path, writable=False):
+        self.dat_path = f"{path}.dat"
+        self.heap_path = f"{path}.heap"
+        self.writable = writable
+        self.lock = threading.RLock()
+        self.index = {}  # Maps topic id to its latest record row
+        self.rows = 0
+        self.dat_map = None
+        self.heap_map = None
+        self.interned = {}  # Maps INTERNED_FIELDS values to heap (offset, length) for this writer
+
+        if writable:
+            self._create_files()
+        self.refresh()
+
+    def _create_files(self):
+        if not os.path.exists(self.dat_path) or os.path.getsize(self.dat_path) < HEADER.size:
+            with open(self.dat_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+        if not os.path.exists(self.heap_path):
+            open(self.heap_path, 'wb').close()
+
+    def refresh(self):
+        """Map newly appended records (cheap if nothing changed)"""
+        with self.lock:
+            try:
+                dat_size = os.path.getsize(self.dat_path)
+            except OSError:
+                return
+            if dat_size < HEADER.size:
+                return
+
+            rows = (dat_size - HEADER.size) // RECORD.size
+            if rows == self.rows and self.dat_map is not None:
+                return
+
+            with open(self.dat_path, 'rb') as f:
+                dat_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, record_size = HEADER.unpack_from(dat_map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+                raise ValueError(f"{self.dat_path} is not a version {FORMAT_VERSION} topic store")
+
+            heap_map = None
+            if os.path.getsize(self.heap_path) > 0:
+                with open(self.heap_path, 'rb') as f:
+                    heap_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            # Only the id column is read to build the index
+            start = HEADER.size + self.rows * RECORD.size
+            new_records = memoryview(dat_map)[start:HEADER.size + rows * RECORD.size]
+            for row, (topic_id,) in enumerate(ID_COLUMN.iter_unpack(new_records), self.rows):
+                self.index[topic_id] = row
+            new_records.release()
+
+            self.dat_map, self.heap_map, self.rows = dat_map, heap_map, rows
+
+    def __len__(self):
+        self.refresh()
+        return len(self.index)
+
+    def __contains__(self, topic_id):
+        if topic_id not in self.index:
+            self.refresh()  # May have been appended by another writer
+        return topic_id in self.index
+
+    def _record(self, row):
+        return RECORD.unpack_from(self.dat_map, HEADER.size + row * RECORD.size)
+
+    def _string(self, offset, length):
+        if not length:
+            return None
+        return self.heap_map[offset:offset + length].decode('utf-8')
+
+    def get(self, topic_id, with_body=True):
+        """Return a topic as the same dict shape the groups.io API uses, or None.
+
+        with_body=False skips decoding the summary and full body, for callers
+        that only look at metadata.
+        """
+        with self.lock:
+            row = self.index.get(topic_id)
+            if row is None:
+                # May have been appended by another writer (e.g. the backfill job)
+                self.refresh()
+                row = self.index.get(topic_id)
+            if row is None:
+                return None
+            record = self._record(row)
+            topic_id, group_id, _, _, num_messages, flags = record[:6]
+            refs = record[6:]
+
+            topic = {
+                'id': topic_id,
+                'group_id': group_id,
+                'group_id_for_url': group_id,
+                'num_messages': num_messages,
+            }
+            for name, bit in FLAGS.items():
+                topic[name] = bool(flags & bit)
+            for i, field in enumerate(STRING_FIELDS):
+                if not with_body and field in ('summary', 'full_body'):
+                    continue
+                value = self._string(refs[2 * i], refs[2 * i + 1])
+                if field == 'extra':
+                    topic.update(json.loads(value) if value else {})
+                elif value is not None:
+                    topic[field] = value
+        return topic
+
+    def version(self, topic_id):
+        """(updated, num_messages) of the stored topic, without decoding bodies"""
+        with self.lock:
+            row = self.index.get(topic_id)
+            if row is None:
+                return None
+            record = self._record(row)
+            refs = record[6:]
+            updated = STRING_FIELDS.index('updated')
+            created = STRING_FIELDS.index('created')
+            stamp = (self._string(refs[2 * updated], refs[2 * updated + 1])
+                     or self._string(refs[2 * created], refs[2 * created + 1]))
+            return (stamp, record[4])
+
+    def _scan(self):
+        """Return (row, id, group_id, created, updated) for every current record"""
+        self.refresh()  # Pick up rows appended by other writers
+        with self.lock:
+            if self.dat_map is None:
+                return []
+            records = memoryview(self.dat_map)[HEADER.size:HEADER.size + self.rows * RECORD.size]
+            index = self.index
+            columns = [
+                (row, *values) for row, values in enumerate(SORT_COLUMNS.iter_unpack(records))
+                if index.get(values[0]) == row  # Skip superseded versions
+            ]
+            records.release()
+        return columns
+
+    def recent_ids(self, limit=None, group_id=None):
+        """Topic ids by most recent update, using only the fixed-width columns"""
+        rows = [
+            (updated or created, topic_id)
+            for _, topic_id, group, created, updated in self._scan()
+            if group_id is None or group == group_id
+        ]
+        rows.sort(reverse=True)
+        return [topic_id for _, topic_id in rows[:limit]]
+
+    def group_ids(self):
+        """Distinct group ids present in the store"""
+        return {group for _, _, group, _, _ in self._scan()}
+
+    def put_topics(self, topics):
+        """Append topics whose version differs from the stored one; returns the count"""
+        if not self.writable:
+            raise PermissionError("TopicStore opened read-only")
+
+        changed = [t for t in topics if self.version(t['id']) != (t.get('updated') or t.get('created'), t.get('num_messages', 0))
+                   or (t.get('full_body') and not self._has_body(t['id']))]
+        if not changed:
+            return 0
+
+        with self.lock, open(self.heap_path, 'ab') as heap, open(self.dat_path, 'ab') as dat:
+            if fcntl:
+                fcntl.flock(dat.fileno(), fcntl.LOCK_EX)
+            try:
+                heap.seek(0, os.SEEK_END)
+                records = [self._pack(topic, heap, self._previous_refs(topic['id'])) for topic in changed]
+                heap.flush()
+                os.fsync(heap.fileno())
+
+                # Align to whole records in case another writer crashed mid-append
+                dat.seek(0, os.SEEK_END)
+                partial = (dat.tell() - HEADER.size) % RECORD.size
+                if partial:
+                    dat.truncate(dat.tell() - partial)
+                    dat.seek(0, os.SEEK_END)
+                dat.write(b''.join(records))
+                dat.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(dat.fileno(), fcntl.LOCK_UN)
+
+        self.refresh()
+        return len(changed)
+
+    def _has_body(self, topic_id):
+        with self.lock:
+            row = self.index.get(topic_id)
+            if row is None:
+                return False
+            refs = self._record(row)[6:]
+            return refs[2 * STRING_FIELDS.index('full_body') + 1] > 0
+
+    def _previous_refs(self, topic_id):
+        """Heap references of the stored version of a topic, or None"""
+        row = self.index.get(topic_id)
+        return self._record(row)[6:] if row is not None else None
+
+    def _pack(self, topic, heap, previous_refs=None):
+        """Write a topic's strings to the heap and return its packed record.
+
+        Strings unchanged since the previous version (typically the body, when
+        only the reply count moved) point at the existing heap bytes.
+        """
+        extra = {k: v for k, v in topic.items() if k not in COLUMN_FIELDS and k != 'group_id'}
+        values = dict(topic, extra=json.dumps(extra) if extra else None)
+
+        refs = []
+        for i, field in enumerate(STRING_FIELDS):
+            value = values.get(field)
+            if value is None:
+                refs.extend((0, 0))
+                continue
+            data = str(value).encode('utf-8')
+            if previous_refs is not None:
+                offset, length = previous_refs[2 * i], previous_refs[2 * i + 1]
+                if length == len(data) and (not length or self.heap_map[offset:offset + length] == data):
+                    refs.extend((offset, length))
+                    continue
+            ref = self.interned.get(data) if field in INTERNED_FIELDS else None
+            if ref is None:
+                ref = (heap.tell(), len(data))
+                heap.write(data)
+                if field in INTERNED_FIELDS:
+                    self.interned[data] = ref
+            refs.extend(ref)
+
+        flags = 0
+        for name, bit in FLAGS.items():
+            if topic.get(name):
+                flags |= bit
+
+        return RECORD.pack(
+            topic['id'],
+            topic.get('group_id_for_url') or topic.get('group_id') or 0,
+            to_micros(topic.get('created')),
+            to_micros(topic.get('updated')),
+            topic.get('num_messages', 0),
+            flags,
+            *refs,
+        )